@@ -1,5 +1,11 @@
 import asyncio
 import logging
+
+try:
+    import uvloop
+except ImportError:  # uvloop indisponible (ex: Windows) - boucle asyncio standard
+    uvloop = None
+
 from src.core.node import RodioNode
 from src.monitoring.api import start_monitoring_api
 
@@ -9,7 +15,12 @@ async def main():
     
     # Initialisation du nœud RODIO
     node = RodioNode("config/config.json")
-    
+
+    # Exécution eager des tâches (Python 3.12+) : les coroutines qui ne
+    # bloquent pas se terminent sans passer par un tour de boucle
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+
     # Démarrage concurrent des services
     await asyncio.gather(
         node.start(),  # Nœud principal
@@ -21,4 +32,6 @@ if __name__ == "__main__":
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     asyncio.run(main())
\ No newline at end of file
@@ -1,8 +1,17 @@
 import os
+import re
 import logging
+from functools import lru_cache
 from dotenv import load_dotenv
 from pydantic import BaseSettings, validator
-from typing import Optional
+from typing import List, Optional
+
+# Chargement des variables d'environnement
+load_dotenv()
+
+# Formats attendus, compilés une seule fois au chargement du module
+_HEX64 = re.compile(r'\A[0-9a-fA-F]{64}\Z')
+_ADDR = re.compile(r'\A0x[0-9a-fA-F]{40}\Z')
 
 class Settings(BaseSettings):
     """Configuration de l'application avec validation stricte"""
@@ -26,6 +35,7 @@ class Settings(BaseSettings):
     # ===== SECURITY =====
     api_key: Optional[str] = None
     jwt_secret: Optional[str] = None
+    cors_origins: List[str] = ["http://localhost:3000"]
     
     # ===== DATABASE =====
     database_url: Optional[str] = None
@@ -41,16 +51,10 @@ class Settings(BaseSettings):
         if v.startswith('0x'):
             v = v[2:]
         
-        # Vérifie la longueur (64 caractères hex)
-        if len(v) != 64:
+        # Vérifie la longueur et le format (64 caractères hex)
+        if not _HEX64.match(v):
             raise ValueError("PRIVATE_KEY doit faire 64 caractères hexadécimaux")
         
-        # Vérifie que c'est bien de l'hexadécimal
-        try:
-            int(v, 16)
-        except ValueError:
-            raise ValueError("PRIVATE_KEY doit être en format hexadécimal")
-        
         return v
     
     @validator('contract_address')
@@ -62,8 +66,8 @@ class Settings(BaseSettings):
         if not v.startswith('0x'):
             raise ValueError("CONTRACT_ADDRESS doit commencer par 0x")
         
-        if len(v) != 42:
-            raise ValueError("CONTRACT_ADDRESS doit faire 42 caractères")
+        if not _ADDR.match(v):
+            raise ValueError("CONTRACT_ADDRESS doit faire 42 caractères hexadécimaux")
         
         return v.lower()
     
@@ -79,9 +83,9 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = False
 
+@lru_cache(maxsize=1)
 def get_settings():
-    """Retourne la configuration validée"""
-    load_dotenv()
+    """Retourne la configuration validée (mise en cache, voir get_settings.cache_clear())"""
     return Settings()
 
 def setup_logging(settings: Settings):
@@ -1,10 +1,11 @@
+import os
 import logging
 import asyncio
-from web3 import Web3
+import orjson
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-import uvicorn
+from fastapi.responses import ORJSONResponse, Response
 from contextlib import asynccontextmanager
 
 from config import settings
@@ -15,18 +16,33 @@ logger = logging.getLogger(__name__)
 # Variables globales pour Web3
 web3 = None
 account = None
+rpc_session = None
+
+def create_rpc_session():
+    """Crée une session HTTP keep-alive partagée par toutes les requêtes RPC"""
+    import aiohttp  # Import différé : seul le cycle de vie en a besoin
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=30),
+        timeout=aiohttp.ClientTimeout(total=5)
+    )
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gestion du cycle de vie de l'application"""
-    global web3, account
+    global web3, account, rpc_session
+    
+    # Import différé de web3 (lourd) au démarrage effectif de l'application
+    from web3 import AsyncWeb3, AsyncHTTPProvider
     
     try:
-        # Initialisation Web3
+        # Initialisation Web3 (connexion RPC réutilisée entre les appels)
         logger.info("🔄 Initialisation de la connexion Web3...")
-        web3 = Web3(Web3.HTTPProvider(settings.polygon_rpc_url))
+        rpc_session = create_rpc_session()
+        provider = AsyncHTTPProvider(settings.polygon_rpc_url)
+        await provider.cache_async_session(rpc_session)
+        web3 = AsyncWeb3(provider)
         
-        if not web3.is_connected():
+        if not await web3.is_connected():
             raise ConnectionError("Impossible de se connecter à Polygon RPC")
         
         # Configuration du compte (SÉCURISÉ)
@@ -42,6 +58,8 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Erreur initialisation: {e}")
         raise
     finally:
+        if rpc_session:
+            await rpc_session.close()
         logger.info("🛑 Arrêt de l'application")
 
 # Création de l'application FastAPI
@@ -49,16 +67,17 @@ app = FastAPI(
     title="RODIO Node API",
     description="Réseau d'Oracles Décentralisés pour l'IoT",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configuration CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # À restreindre en production
+    allow_origins=settings.cors_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Authorization", "Content-Type"],
 )
 
 # Sécurité API (optionnelle)
@@ -75,26 +94,31 @@ async def verify_api_key(credentials: HTTPAuthorizationCredentials = Depends(sec
             )
     return credentials
 
+# Réponse de l'endpoint racine, statique : encodée une seule fois
+ROOT_PAYLOAD = orjson.dumps({
+    "message": "RODIO Node API",
+    "version": "1.0.0",
+    "node_id": settings.node_id,
+    "status": "running"
+})
+
 @app.get("/")
 async def root():
     """Endpoint racine"""
-    return {
-        "message": "RODIO Node API", 
-        "version": "1.0.0",
-        "node_id": settings.node_id,
-        "status": "running"
-    }
+    return Response(content=ROOT_PAYLOAD, media_type="application/json")
 
 @app.get("/health")
 async def health_check():
     """Endpoint de santé de l'application"""
     try:
-        if not web3 or not web3.is_connected():
+        if not web3 or not await web3.is_connected():
             raise HTTPException(status_code=503, detail="Blockchain non connectée")
         
-        # Vérifications de santé
-        block_number = web3.eth.block_number
-        balance = web3.eth.get_balance(web3.eth.default_account)
+        # Vérifications de santé (appels RPC indépendants, lancés en parallèle)
+        block_number, balance = await asyncio.gather(
+            web3.eth.block_number,
+            web3.eth.get_balance(web3.eth.default_account)
+        )
         
         return {
             "status": "healthy",
@@ -109,6 +133,9 @@ async def health_check():
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
 
+# Champs obligatoires d'une soumission capteur
+REQUIRED_SENSOR_FIELDS = frozenset({'sensor_id', 'value', 'timestamp'})
+
 @app.post("/api/sensor-data")
 async def submit_sensor_data(
     sensor_data: dict,
@@ -117,13 +144,12 @@ async def submit_sensor_data(
     """Endpoint pour soumettre des données capteur (sécurisé)"""
     try:
         # Validation des données
-        required_fields = ['sensor_id', 'value', 'timestamp']
-        for field in required_fields:
-            if field not in sensor_data:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Champ requis manquant: {field}"
-                )
+        missing = REQUIRED_SENSOR_FIELDS.difference(sensor_data)
+        if missing:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Champs requis manquants: {sorted(missing)}"
+            )
         
         # Log sécurisé (sans données sensibles)
         logger.info(f"📡 Données reçues du capteur: {sensor_data.get('sensor_id')}")
@@ -149,6 +175,15 @@ async def submit_sensor_data(
 async def get_status(credentials: HTTPAuthorizationCredentials = Depends(verify_api_key)):
     """Status détaillé du nœud (sécurisé)"""
     try:
+        if web3:
+            connected, current_block, network_id = await asyncio.gather(
+                web3.is_connected(),
+                web3.eth.block_number,
+                web3.net.version
+            )
+        else:
+            connected, current_block, network_id = False, 0, "unknown"
+        
         return {
             "node_info": {
                 "node_id": settings.node_id,
@@ -157,9 +192,9 @@ async def get_status(credentials: HTTPAuthorizationCredentials = Depends(verify_
                 "rpc_url": settings.polygon_rpc_url
             },
             "blockchain_status": {
-                "connected": web3.is_connected() if web3 else False,
-                "current_block": web3.eth.block_number if web3 else 0,
-                "network_id": web3.net.version if web3 else "unknown"
+                "connected": connected,
+                "current_block": current_block,
+                "network_id": network_id
             },
             "configuration": {
                 "mqtt_broker": settings.mqtt_broker,
@@ -173,14 +208,23 @@ async def get_status(credentials: HTTPAuthorizationCredentials = Depends(verify_
         raise HTTPException(status_code=500, detail="Erreur interne du serveur")
 
 if __name__ == "__main__":
+    import uvicorn
+    
     logger.info(f"🚀 Démarrage du nœud RODIO: {settings.node_id}")
     logger.info(f"🔗 Connexion à: {settings.polygon_rpc_url}")
     logger.info(f"📡 Port API: {settings.api_port}")
     
+    # Rechargement automatique uniquement en développement (log DEBUG),
+    # sinon un worker par cœur avec le parseur HTTP httptools
+    reload = settings.log_level == "DEBUG"
+    
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=settings.api_port,
-        reload=True,  # Seulement en développement
+        reload=reload,
+        workers=1 if reload else os.cpu_count(),
+        loop="uvloop",
+        http="httptools",
         log_level=settings.log_level.lower()
     )
\ No newline at end of file
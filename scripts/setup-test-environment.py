@@ -9,8 +9,15 @@ import json
 import shutil
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # orjson optionnel - repli sur le module json standard
+    orjson = None
+
 class TestEnvironmentSetup:
     """Configuration de l'environnement de test"""
     
@@ -94,7 +101,8 @@ class TestEnvironmentSetup:
         ]
         
         for i, node in enumerate(nodes):
-            config = base_config.copy()
+            # Copie profonde : les sections imbriquées ne sont pas partagées entre nœuds
+            config = deepcopy(base_config)
             config["node"]["id"] = node["id"]
             config["monitoring"]["api_port"] = node["port"]
             
@@ -107,8 +115,11 @@ class TestEnvironmentSetup:
             
             # Sauvegarde de la configuration
             config_file = self.test_configs_dir / f"node{i+1}-config.json"
-            with open(config_file, 'w') as f:
-                json.dump(config, f, indent=2)
+            if orjson is not None:
+                config_file.write_bytes(orjson.dumps(config, option=orjson.OPT_INDENT_2))
+            else:
+                with open(config_file, 'w') as f:
+                    json.dump(config, f, indent=2)
             
             print(f"   ✅ {config_file}")
     
@@ -255,6 +266,15 @@ echo "📈 Métriques disponibles sur http://localhost:9090"
         
         print(f"   ✅ {run_tests_file}")
     
+    def _probe(self, cmd: str, name: str):
+        """Vérifie qu'une commande est disponible, retourne (nom, disponible)"""
+        try:
+            subprocess.run([cmd, "--version"], 
+                         capture_output=True, check=True)
+            return name, True
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return name, False
+    
     def check_dependencies(self):
         """Vérifie que les dépendances sont installées"""
         print("🔍 Vérification des dépendances...")
@@ -267,13 +287,16 @@ echo "📈 Métriques disponibles sur http://localhost:9090"
             ("jq", "jq (JSON processor)")
         ]
         
+        # Les vérifications sont indépendantes : lancées en parallèle,
+        # affichées dans l'ordre de la liste
+        with ThreadPoolExecutor(max_workers=len(dependencies)) as executor:
+            results = list(executor.map(lambda dep: self._probe(*dep), dependencies))
+        
         missing = []
-        for cmd, name in dependencies:
-            try:
-                subprocess.run([cmd, "--version"], 
-                             capture_output=True, check=True)
+        for name, ok in results:
+            if ok:
                 print(f"   ✅ {name}")
-            except (subprocess.CalledProcessError, FileNotFoundError):
+            else:
                 print(f"   ❌ {name}")
                 missing.append(name)
         
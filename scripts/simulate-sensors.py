@@ -5,14 +5,38 @@ Génère des données réalistes avec outliers occasionnels
 """
 
 import asyncio
-import random
 import json
+import os
 import time
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
 from dataclasses import dataclass
 
-@dataclass
+import msgspec
+import numpy as np
+
+try:
+    import uvloop
+except ImportError:  # uvloop indisponible (ex: Windows) - boucle asyncio standard
+    uvloop = None
+
+try:
+    from asyncio_mqtt import Client as MQTTClient
+except ImportError:  # Sans client MQTT, les lectures sont seulement loggées
+    MQTTClient = None
+
+# Codes de type de capteur pour les tableaux vectorisés
+_TEMPERATURE, _HUMIDITY, _GPS = 0, 1, 2
+_TYPE_CODES = {"temperature": _TEMPERATURE, "humidity": _HUMIDITY, "gps": _GPS}
+
+# Plages des valeurs aberrantes par type (le GPS simule une perte de signal)
+_OUTLIER_RANGES = {_TEMPERATURE: (-50.0, 100.0), _HUMIDITY: (-10.0, 120.0), _GPS: (0.0, 0.0)}
+
+# Coordonnées de base des capteurs GPS (Paris)
+_BASE_LAT = 48.8566
+_BASE_LON = 2.3522
+
+@dataclass(slots=True, frozen=True)
 class SensorProfile:
     """Profile d'un capteur avec ses caractéristiques"""
     sensor_id: str
@@ -23,13 +47,68 @@ class SensorProfile:
     noise_level: float = 0.1
     outlier_probability: float = 0.05
 
+class SensorReading(msgspec.Struct):
+    """Lecture d'un capteur scalaire (température, humidité)"""
+    sensor_id: str
+    sensor_type: str
+    value: float
+    unit: str
+    timestamp: int
+    quality_score: float
+    battery_level: float
+    signal_strength: int
+
+class GPSPosition(msgspec.Struct):
+    """Position calculée par un capteur GPS"""
+    latitude: float
+    longitude: float
+    altitude: float
+    accuracy: float
+
+class GPSReading(msgspec.Struct, omit_defaults=True):
+    """Lecture d'un capteur GPS (value vaut None en l'absence de fix)"""
+    sensor_id: str
+    sensor_type: str
+    value: Optional[GPSPosition]
+    unit: str
+    timestamp: int
+    satellites: int
+    hdop: float
+    fix_quality: str
+    speed: Optional[float] = None
+    heading: Optional[int] = None
+    error: Optional[str] = None
+
+Reading = Union[SensorReading, GPSReading]
+
+# Encodeur JSON réutilisé pour toutes les publications
+_encoder = msgspec.json.Encoder()
+
 class SensorSimulator:
     """Simulateur de capteurs IoT pour tests"""
     
-    def __init__(self):
+    def __init__(self, mqtt_broker: Optional[str] = None, mqtt_port: int = 1883):
         self.sensors = self._create_sensor_profiles()
         self.running = False
-        
+        self.mqtt_broker = mqtt_broker
+        self.mqtt_port = mqtt_port
+        self.rng = np.random.default_rng()
+
+        # Projection des profils en tableaux parallèles (SoA) : le tirage
+        # vectorisé et les statistiques lisent ces tableaux par index
+        profiles = self.sensors
+        self._sensor_ids = [s.sensor_id for s in profiles]
+        self._sensor_types = [s.sensor_type for s in profiles]
+        self._units = [s.unit for s in profiles]
+        self._types_code = np.array([_TYPE_CODES[s.sensor_type] for s in profiles], dtype=np.int8)
+        self._mins = np.array([s.min_value for s in profiles], dtype=np.float32)
+        self._maxs = np.array([s.max_value for s in profiles], dtype=np.float32)
+        self._noise = np.array([s.noise_level for s in profiles], dtype=np.float32)
+        self._outlier_p = np.array([s.outlier_probability for s in profiles], dtype=np.float32)
+        self._outlier_low = np.array([_OUTLIER_RANGES[t][0] for t in self._types_code], dtype=np.float32)
+        self._outlier_high = np.array([_OUTLIER_RANGES[t][1] for t in self._types_code], dtype=np.float32)
+
+
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
     
@@ -50,125 +129,168 @@ class SensorSimulator:
             SensorProfile("gps_drone_01", "gps", 0.0, 1.0, "coordinates", 0.0005, 0.15),
         ]
     
-    def generate_sensor_reading(self, sensor: SensorProfile) -> Dict:
-        """Génère une lecture de capteur"""
-        # Valeur de base
-        base_value = (sensor.min_value + sensor.max_value) / 2
-        
-        # Variation naturelle
-        variation_range = (sensor.max_value - sensor.min_value) * 0.3
-        variation = random.uniform(-variation_range, variation_range)
-        
-        # Bruit du capteur
-        noise = random.uniform(-sensor.noise_level, sensor.noise_level)
-        
-        # Valeur finale
-        value = base_value + variation + noise
-        
-        # Génération d'outliers occasionnels
-        if random.random() < sensor.outlier_probability:
-            if sensor.sensor_type == "temperature":
-                value = random.uniform(-50, 100)  # Valeur aberrante
-            elif sensor.sensor_type == "humidity":
-                value = random.uniform(-10, 120)
-            elif sensor.sensor_type == "gps":
+    def generate_readings(self, timestamp: Optional[int] = None) -> List[Reading]:
+        """Génère une lecture pour chaque capteur en un seul tirage vectorisé
+
+        Toutes les lectures d'un même tick partagent le même timestamp.
+        """
+        if timestamp is None:
+            timestamp = time.time_ns() // 1_000_000_000
+        rng = self.rng
+        n = len(self._sensor_ids)
+
+        # Valeur de base + variation naturelle + bruit du capteur
+        base_values = (self._mins + self._maxs) / 2
+        variation_ranges = (self._maxs - self._mins) * 0.3
+        values = (base_values
+                  + rng.uniform(-1.0, 1.0, n) * variation_ranges
+                  + rng.uniform(-1.0, 1.0, n) * self._noise)
+
+        # Génération d'outliers occasionnels (perte de signal pour le GPS)
+        outliers = rng.random(n) < self._outlier_p
+        values = np.where(outliers, rng.uniform(self._outlier_low, self._outlier_high), values)
+
+        quality = rng.uniform(0.8, 1.0, n).tolist()
+        battery = rng.uniform(20, 100, n).tolist()
+        signal = rng.integers(1, 6, n).tolist()
+
+        # Champs GPS tirés pour tous les capteurs (coût négligeable, pas de branche)
+        lat_drift = rng.uniform(-0.001, 0.001, n).tolist()
+        lon_drift = rng.uniform(-0.001, 0.001, n).tolist()
+        satellites = rng.integers(4, 13, n).tolist()
+        hdop = rng.uniform(0.8, 3.0, n).tolist()
+        altitude = rng.uniform(50, 200, n).tolist()
+        speed = rng.uniform(0, 80, n).tolist()
+        heading = rng.integers(0, 360, n).tolist()
+        no_fix_satellites = rng.integers(0, 4, n).tolist()
+        no_fix_hdop = rng.uniform(5.0, 20.0, n).tolist()
+
+        readings: List[Reading] = [None] * n
+        rows = zip(self._sensor_ids, self._sensor_types, self._units,
+                   self._types_code.tolist(), values.tolist(), outliers.tolist())
+        for i, (sensor_id, sensor_type, unit, type_code, value, is_outlier) in enumerate(rows):
+            if type_code != _GPS:
+                readings[i] = SensorReading(
+                    sensor_id=sensor_id,
+                    sensor_type=sensor_type,
+                    value=round(value, 2),
+                    unit=unit,
+                    timestamp=timestamp,
+                    quality_score=quality[i],
+                    battery_level=battery[i],
+                    signal_strength=signal[i]
+                )
+            elif is_outlier:
                 # Simulation de perte de signal GPS
-                return self._generate_gps_no_fix(sensor)
-        
-        # Formatage selon le type de capteur
-        if sensor.sensor_type == "gps":
-            return self._generate_gps_reading(sensor, value)
-        else:
-            return {
-                "sensor_id": sensor.sensor_id,
-                "sensor_type": sensor.sensor_type,
-                "value": round(value, 2),
-                "unit": sensor.unit,
-                "timestamp": int(time.time()),
-                "quality_score": random.uniform(0.8, 1.0),
-                "battery_level": random.uniform(20, 100),
-                "signal_strength": random.randint(1, 5)
-            }
-    
-    def _generate_gps_reading(self, sensor: SensorProfile, drift: float) -> Dict:
-        """Génère une lecture GPS réaliste"""
-        # Coordonnées de base (Paris)
-        base_lat = 48.8566
-        base_lon = 2.3522
-        
-        # Dérive GPS réaliste
-        lat_drift = drift * random.uniform(-0.001, 0.001)
-        lon_drift = drift * random.uniform(-0.001, 0.001)
-        
-        satellites = random.randint(4, 12)
-        hdop = random.uniform(0.8, 3.0)
-        
-        return {
-            "sensor_id": sensor.sensor_id,
-            "sensor_type": "gps",
-            "value": {
-                "latitude": round(base_lat + lat_drift, 6),
-                "longitude": round(base_lon + lon_drift, 6),
-                "altitude": round(random.uniform(50, 200), 1),
-                "accuracy": round(hdop * 5, 1)
-            },
-            "unit": "coordinates",
-            "timestamp": int(time.time()),
-            "satellites": satellites,
-            "hdop": round(hdop, 1),
-            "fix_quality": "GPS" if satellites >= 4 else "NO_FIX",
-            "speed": round(random.uniform(0, 80), 1),
-            "heading": random.randint(0, 359)
-        }
-    
-    def _generate_gps_no_fix(self, sensor: SensorProfile) -> Dict:
-        """Génère une lecture GPS sans fix (perte de signal)"""
-        return {
-            "sensor_id": sensor.sensor_id,
-            "sensor_type": "gps",
-            "value": None,
-            "unit": "coordinates",
-            "timestamp": int(time.time()),
-            "satellites": random.randint(0, 3),
-            "hdop": random.uniform(5.0, 20.0),
-            "fix_quality": "NO_FIX",
-            "error": "Insufficient satellites"
-        }
+                readings[i] = GPSReading(
+                    sensor_id=sensor_id,
+                    sensor_type=sensor_type,
+                    value=None,
+                    unit=unit,
+                    timestamp=timestamp,
+                    satellites=no_fix_satellites[i],
+                    hdop=no_fix_hdop[i],
+                    fix_quality="NO_FIX",
+                    error="Insufficient satellites"
+                )
+            else:
+                # Dérive GPS réaliste autour des coordonnées de base (Paris)
+                readings[i] = GPSReading(
+                    sensor_id=sensor_id,
+                    sensor_type=sensor_type,
+                    value=GPSPosition(
+                        latitude=round(_BASE_LAT + value * lat_drift[i], 6),
+                        longitude=round(_BASE_LON + value * lon_drift[i], 6),
+                        altitude=round(altitude[i], 1),
+                        accuracy=round(hdop[i] * 5, 1)
+                    ),
+                    unit=unit,
+                    timestamp=timestamp,
+                    satellites=satellites[i],
+                    hdop=round(hdop[i], 1),
+                    fix_quality="GPS" if satellites[i] >= 4 else "NO_FIX",
+                    speed=round(speed[i], 1),
+                    heading=heading[i]
+                )
+
+        return readings
     
     async def start_simulation(self, interval: float = 5.0):
         """Démarre la simulation continue"""
         self.running = True
-        self.logger.info(f"🚀 Démarrage simulation avec {len(self.sensors)} capteurs")
+        self.logger.info("🚀 Démarrage simulation avec %d capteurs", len(self._sensor_ids))
+        
+        if self.mqtt_broker and MQTTClient is None:
+            self.logger.warning("⚠️ asyncio-mqtt non installé - lectures loggées uniquement")
+        
+        if self.mqtt_broker and MQTTClient is not None:
+            # Une seule connexion MQTT persistante, rouverte si le broker la coupe
+            while self.running:
+                try:
+                    async with MQTTClient(self.mqtt_broker, self.mqtt_port, keepalive=60) as client:
+                        self.logger.info("📡 Connecté au broker MQTT %s:%d", self.mqtt_broker, self.mqtt_port)
+                        await self._simulation_loop(interval, client)
+                except Exception as e:
+                    self.logger.warning("⚠️ Connexion MQTT perdue, reconnexion dans 5s: %s", e)
+                    await asyncio.sleep(5)
+        else:
+            await self._simulation_loop(interval, None)
+    
+    async def _simulation_loop(self, interval: float, client):
+        """Boucle de génération (et de publication MQTT si un client est fourni)"""
+        # Cadence des ticks calée sur l'horloge monotone (pas de dérive)
+        next_tick = time.monotonic()
         
         while self.running:
             try:
-                # Génération des lectures pour tous les capteurs
-                readings = []
-                for sensor in self.sensors:
-                    reading = self.generate_sensor_reading(sensor)
-                    readings.append(reading)
-                    
-                    # Log de la lecture
-                    if reading.get('value') is not None:
-                        if sensor.sensor_type == "gps":
-                            lat = reading['value']['latitude']
-                            lon = reading['value']['longitude']
-                            self.logger.info(f"📍 {sensor.sensor_id}: {lat}, {lon}")
-                        else:
-                            value = reading['value']
-                            unit = reading['unit']
-                            self.logger.info(f"📊 {sensor.sensor_id}: {value} {unit}")
-                    else:
-                        self.logger.warning(f"⚠️ {sensor.sensor_id}: Pas de données")
-                
-                # Simulation d'envoi MQTT (ici juste un log)
-                self.logger.info(f"📡 {len(readings)} lectures générées")
-                
-                await asyncio.sleep(interval)
+                # Génération des lectures pour tous les capteurs (passe
+                # synchrone unique, aucun await dans la boucle)
+                readings = self.generate_readings(time.time_ns() // 1_000_000_000)
+
+                # Détail par capteur, uniquement en DEBUG
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self._log_readings(readings)
                 
             except Exception as e:
-                self.logger.error(f"❌ Erreur simulation: {e}")
+                self.logger.error("❌ Erreur simulation: %s", e)
                 await asyncio.sleep(1)
+                next_tick = time.monotonic()
+                continue
+
+            # Un échec de publication remonte à start_simulation qui rouvre la connexion
+            if client is not None:
+                await self.publish_readings(client, readings)
+
+            if self.logger.isEnabledFor(logging.INFO):
+                no_data = sum(1 for r in readings if r.value is None)
+                self.logger.info("📡 %d lectures %s (%d sans données)", len(readings),
+                                 "publiées" if client is not None else "générées", no_data)
+
+            next_tick += interval
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+    
+    async def publish_readings(self, client, readings: List[Reading]):
+        """Publie toutes les lectures d'un tick en parallèle sur la connexion MQTT"""
+        async with asyncio.TaskGroup() as tg:
+            for reading in readings:
+                # Schéma sensors/<capteur>/<type>, celui des abonnements des adapters
+                tg.create_task(client.publish(
+                    f"sensors/{reading.sensor_id}/{reading.sensor_type}",
+                    _encoder.encode(reading),
+                    qos=0
+                ))
+    
+    def _log_readings(self, readings: List[Reading]):
+        """Log le détail de chaque lecture (niveau DEBUG)"""
+        for reading in readings:
+            value = reading.value
+            if value is None:
+                self.logger.debug("⚠️ %s: Pas de données", reading.sensor_id)
+            elif isinstance(value, GPSPosition):
+                self.logger.debug("📍 %s: %s, %s", reading.sensor_id,
+                                  value.latitude, value.longitude)
+            else:
+                self.logger.debug("📊 %s: %s %s", reading.sensor_id, value, reading.unit)
     
     def stop_simulation(self):
         """Arrête la simulation"""
@@ -178,28 +300,33 @@ class SensorSimulator:
     def get_sensor_stats(self) -> Dict:
         """Retourne les statistiques des capteurs"""
         stats = {
-            "total_sensors": len(self.sensors),
+            "total_sensors": len(self._sensor_ids),
             "sensor_types": {},
             "sensors": []
         }
         
-        for sensor in self.sensors:
-            if sensor.sensor_type not in stats["sensor_types"]:
-                stats["sensor_types"][sensor.sensor_type] = 0
-            stats["sensor_types"][sensor.sensor_type] += 1
+        rows = zip(self._sensor_ids, self._sensor_types, self._units, self._mins.tolist(),
+                   self._maxs.tolist(), self._outlier_p.tolist())
+        for sensor_id, sensor_type, unit, min_value, max_value, outlier_p in rows:
+            if sensor_type not in stats["sensor_types"]:
+                stats["sensor_types"][sensor_type] = 0
+            stats["sensor_types"][sensor_type] += 1
             
             stats["sensors"].append({
-                "id": sensor.sensor_id,
-                "type": sensor.sensor_type,
-                "range": f"{sensor.min_value}-{sensor.max_value} {sensor.unit}",
-                "outlier_rate": f"{sensor.outlier_probability*100:.1f}%"
+                "id": sensor_id,
+                "type": sensor_type,
+                "range": f"{min_value}-{max_value} {unit}",
+                "outlier_rate": f"{outlier_p*100:.1f}%"
             })
         
         return stats
 
 async def main():
     """Point d'entrée principal"""
-    simulator = SensorSimulator()
+    simulator = SensorSimulator(
+        mqtt_broker=os.getenv("MQTT_BROKER"),
+        mqtt_port=int(os.getenv("MQTT_PORT", "1883"))
+    )
     
     # Affichage des statistiques
     stats = simulator.get_sensor_stats()
@@ -212,10 +339,12 @@ async def main():
     print("   Ctrl+C pour arrêter\n")
     
     try:
-        await simulator.start_simulation(interval=3.0)
+        await simulator.start_simulation(interval=float(os.getenv("SIMULATION_INTERVAL", "3.0")))
     except KeyboardInterrupt:
         simulator.stop_simulation()
         print("\n✅ Simulation terminée")
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     asyncio.run(main())
\ No newline at end of file
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import time
 
 class SensorAdapter(ABC):
@@ -8,8 +8,11 @@ class SensorAdapter(ABC):
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.sensor_type = self.__class__.__name__.replace('Adapter', '').lower()
-        self.last_reading_time = 0
+        self.last_reading_time = 0  # Horodatage epoch de la dernière lecture (statistiques)
+        self._last_reading_monotonic: Optional[float] = None  # Horloge monotone pour should_poll
         self.reading_count = 0
+        # Config immuable après construction : intervalle résolu une seule fois
+        self._polling_interval = int(config.get('polling_interval', 60))
     
     @abstractmethod
     async def read_data(self) -> Dict[str, Any]:
@@ -26,19 +29,31 @@ class SensorAdapter(ABC):
         """Transforme les données brutes en format standardisé"""
         pass
     
+    def validate_and_transform(self, raw_data: Dict) -> Optional[Dict[str, Any]]:
+        """Valide puis transforme une lecture ; None si les données sont invalides"""
+        if not self.validate_data(raw_data):
+            return None
+        return self.transform_data(raw_data)
+    
+    async def aclose(self):
+        """Libère les ressources de l'adapter (connexions, tâches de fond)"""
+        pass
+    
     def get_polling_interval(self) -> int:
         """Retourne l'intervalle de polling en secondes"""
-        return self.config.get('polling_interval', 60)
+        return self._polling_interval
     
     def should_poll(self) -> bool:
         """Détermine s'il faut faire une nouvelle lecture"""
-        current_time = time.time()
-        return (current_time - self.last_reading_time) >= self.get_polling_interval()
+        if self._last_reading_monotonic is None:
+            return True
+        return (time.monotonic() - self._last_reading_monotonic) >= self._polling_interval
     
-    def update_reading_stats(self):
-        """Met à jour les statistiques de lecture"""
+    def update_reading_stats(self, n: int = 1):
+        """Met à jour les statistiques de lecture (n lectures pour un lot)"""
+        self._last_reading_monotonic = time.monotonic()
         self.last_reading_time = time.time()
-        self.reading_count += 1
+        self.reading_count += n
     
     def get_stats(self) -> Dict[str, Any]:
         """Retourne les statistiques de l'adapter"""
@@ -1,141 +1,182 @@
 import asyncio
+import logging
 import random
 import time
-from typing import Dict, Any
+
+import numpy as np
+
+from typing import Dict, Any, Optional
 from src.adapters.base_adapter import SensorAdapter
 
+logger = logging.getLogger(__name__)
+
+# Multiplicateurs de qualité indexés par palier (HDOP <=1.5/<=2.0/>2.0, satellites <6/<8/>=8)
+# Tuples pour les lectures unitaires, tableaux pour le mode batch
+HDOP_MULT = (1.0, 0.9, 0.7)
+SAT_MULT = (0.8, 1.0, 1.1)
+_HDOP_MULT_ARR = np.array(HDOP_MULT)
+_SAT_MULT_ARR = np.array(SAT_MULT)
+
 class GPSAdapter(SensorAdapter):
     """Adapter pour capteurs GPS"""
     
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
-        self.mqtt_topic = config.get('mqtt_topic', 'sensors/gps')
+        self._simulated_latency = float(config.get('simulated_latency', 0.2))
+        self.mqtt_topic = config.get('mqtt_topic', 'sensors/+/gps')
+        self._sensor_id = f'gps_{hash(self.mqtt_topic) % 1000}'
+        self._rng = np.random.default_rng()  # Tirages vectorisés (mode batch)
+        self._py_rng = random.Random()  # Tirages unitaires, sans surcoût NumPy
         # Coordonnées de base (Paris par défaut)
         self.base_lat = config.get('base_latitude', 48.8566)
         self.base_lon = config.get('base_longitude', 2.3522)
     
     async def read_data(self) -> Dict[str, Any]:
         """Lit les données GPS"""
-        await asyncio.sleep(0.2)  # GPS plus lent
+        if self._simulated_latency:  # GPS plus lent
+            await asyncio.sleep(self._simulated_latency)
+        rng = self._py_rng
+        
+        # Simulation de dérive GPS réaliste (~100m)
+        lat_drift = rng.uniform(-0.001, 0.001)
+        lon_drift = rng.uniform(-0.001, 0.001)
         
-        # Simulation de dérive GPS réaliste
-        lat_drift = random.uniform(-0.001, 0.001)  # ~100m de dérive
-        lon_drift = random.uniform(-0.001, 0.001)
+        # Précision variable selon conditions (Horizontal Dilution of Precision)
+        hdop = rng.uniform(0.8, 3.0)
+        satellites = rng.randint(4, 12)
         
-        # Précision variable selon conditions
-        hdop = random.uniform(0.8, 3.0)  # Horizontal Dilution of Precision
-        satellites = random.randint(4, 12)
+        # Simulation de perte de signal (10% de chance)
+        signal_lost = rng.random() < 0.1
+        if signal_lost:
+            satellites = rng.randint(0, 3)
         
         raw_data = {
             'latitude': round(self.base_lat + lat_drift, 6),
             'longitude': round(self.base_lon + lon_drift, 6),
-            'altitude': round(random.uniform(50, 200), 1),  # Altitude en mètres
-            'speed': round(random.uniform(0, 5), 1),  # Vitesse en km/h
-            'heading': random.randint(0, 359),  # Direction en degrés
+            'altitude': round(rng.uniform(50, 200), 1),  # Altitude en mètres
+            'speed': round(rng.uniform(0, 5), 1),  # Vitesse en km/h
+            'heading': rng.randint(0, 359),  # Direction en degrés
             'satellites': satellites,
             'hdop': round(hdop, 1),
-            'fix_quality': 'GPS' if satellites >= 4 else 'NO_FIX',
-            'timestamp_gps': int(time.time()),
-            'sensor_id': f'gps_{hash(self.mqtt_topic) % 1000}'
+            'fix_quality': 'NO_FIX' if signal_lost or satellites < 4 else 'GPS',
+            'timestamp_gps': time.time_ns() // 1_000_000_000,
+            'sensor_id': self._sensor_id
         }
         
-        # Simulation de perte de signal
-        if random.random() < 0.1:  # 10% de chance de perte
-            raw_data['fix_quality'] = 'NO_FIX'
-            raw_data['satellites'] = random.randint(0, 3)
-        
         self.update_reading_stats()
         return raw_data
     
+    async def read_data_batch(self, n: int) -> Dict[str, Any]:
+        """Lit n relevés GPS en une fois (structure de tableaux)"""
+        if self._simulated_latency:  # GPS plus lent
+            await asyncio.sleep(self._simulated_latency)
+        rng = self._rng
+        
+        # Simulation de dérive GPS réaliste (~100m)
+        lat_drift = rng.uniform(-0.001, 0.001, n)
+        lon_drift = rng.uniform(-0.001, 0.001, n)
+        
+        # Précision variable selon conditions (Horizontal Dilution of Precision)
+        hdop = rng.uniform(0.8, 3.0, n)
+        satellites = rng.integers(4, 13, n)
+        
+        # Simulation de perte de signal (10% de chance)
+        signal_lost = rng.random(n) < 0.1
+        satellites = np.where(signal_lost, rng.integers(0, 4, n), satellites)
+        fix_quality = np.where(
+            signal_lost | (satellites < 4), 'NO_FIX', 'GPS'
+        ).astype(object)
+        
+        raw_data = {
+            'latitude': np.round(self.base_lat + lat_drift, 6),
+            'longitude': np.round(self.base_lon + lon_drift, 6),
+            'altitude': np.round(rng.uniform(50, 200, n), 1),  # Altitude en mètres
+            'speed': np.round(rng.uniform(0, 5, n), 1),  # Vitesse en km/h
+            'heading': rng.integers(0, 360, n),  # Direction en degrés
+            'satellites': satellites,
+            'hdop': np.round(hdop, 1),
+            'fix_quality': fix_quality,
+            'timestamp_gps': time.time_ns() // 1_000_000_000,
+            'sensor_id': self._sensor_id
+        }
+        
+        self.update_reading_stats(n)
+        return raw_data
+    
     def validate_data(self, data: Dict) -> bool:
-        """Valide les données GPS"""
+        """Valide les données GPS (règles de validate_and_transform)"""
+        return self.validate_and_transform(data) is not None
+    
+    def transform_data(self, raw_data: Dict) -> Dict[str, Any]:
+        """Transforme les données GPS (ValueError si invalides)"""
+        transformed = self.validate_and_transform(raw_data)
+        if transformed is None:
+            raise ValueError("Données GPS invalides")
+        return transformed
+    
+    def validate_and_transform(self, raw_data: Dict) -> Optional[Dict[str, Any]]:
+        """Valide et transforme les données GPS en une seule passe"""
         try:
-            # Vérification de la qualité du fix
-            if data.get('fix_quality') != 'GPS':
-                print("⚠️ Pas de fix GPS valide")
-                return False
+            fix_quality = raw_data.get('fix_quality')
+            satellites = raw_data.get('satellites', 0)
+            lat = raw_data.get('latitude')
+            lon = raw_data.get('longitude')
+            hdop = raw_data.get('hdop', 999)
             
-            # Vérification du nombre de satellites
-            satellites = data.get('satellites', 0)
+            if fix_quality != 'GPS':
+                logger.warning("⚠️ Pas de fix GPS valide")
+                return None
             if satellites < 4:
-                print(f"⚠️ Pas assez de satellites: {satellites}")
-                return False
-            
-            # Vérification des coordonnées
-            lat = data.get('latitude')
-            lon = data.get('longitude')
-            
+                logger.warning("⚠️ Pas assez de satellites: %s", satellites)
+                return None
             if lat is None or lon is None:
-                return False
-            
-            # Vérification des limites géographiques
+                return None
             if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
-                print(f"⚠️ Coordonnées invalides: {lat}, {lon}")
-                return False
-            
-            # Vérification HDOP (précision)
-            hdop = data.get('hdop', 999)
-            if hdop > 5.0:  # HDOP trop élevé = précision faible
-                print(f"⚠️ Précision GPS insuffisante: HDOP {hdop}")
-                return False
-            
-            return True
-            
-        except Exception as e:
-            print(f"❌ Erreur validation GPS: {e}")
-            return False
-    
-    def transform_data(self, raw_data: Dict) -> Dict[str, Any]:
-        """Transforme les données GPS"""
-        try:
-            # Calcul de la précision estimée basée sur HDOP
-            hdop = raw_data.get('hdop', 1.0)
-            estimated_accuracy = hdop * 5  # Approximation en mètres
+                logger.warning("⚠️ Coordonnées invalides: %s, %s", lat, lon)
+                return None
+            if hdop > 5.0:
+                logger.warning("⚠️ Précision GPS insuffisante: HDOP %s", hdop)
+                return None
             
-            transformed_data = {
+            return {
                 'sensor_type': 'gps',
                 'value': {
-                    'latitude': raw_data['latitude'],
-                    'longitude': raw_data['longitude'],
+                    'latitude': lat,
+                    'longitude': lon,
                     'altitude': raw_data.get('altitude'),
-                    'accuracy': round(estimated_accuracy, 1)
+                    'accuracy': round(hdop * 5, 1)
                 },
                 'unit': 'coordinates',
-                'timestamp': raw_data.get('timestamp_gps', int(time.time())),
+                'timestamp': raw_data.get('timestamp_gps', time.time_ns() // 1_000_000_000),
                 'sensor_id': raw_data.get('sensor_id'),
                 'quality_score': self._calculate_gps_quality(raw_data),
                 'metadata': {
-                    'satellites': raw_data.get('satellites'),
-                    'hdop': raw_data.get('hdop'),
+                    'satellites': satellites,
+                    'hdop': hdop,
                     'speed': raw_data.get('speed'),
                     'heading': raw_data.get('heading'),
-                    'fix_quality': raw_data.get('fix_quality'),
+                    'fix_quality': fix_quality,
                     'mqtt_topic': self.mqtt_topic
                 }
             }
             
-            return transformed_data
-            
         except Exception as e:
-            print(f"❌ Erreur transformation GPS: {e}")
-            raise
+            logger.error("❌ Erreur validation GPS: %s", e)
+            return None
     
     def _calculate_gps_quality(self, raw_data: Dict) -> float:
-        """Calcule un score de qualité GPS"""
-        score = 1.0
-        
-        # Pénalité basée sur HDOP
+        """Calcule un score de qualité GPS (scalaire ou tableau pour le mode batch)"""
         hdop = raw_data.get('hdop', 1.0)
-        if hdop > 2.0:
-            score *= 0.7
-        elif hdop > 1.5:
-            score *= 0.9
-        
-        # Bonus pour nombre de satellites
         satellites = raw_data.get('satellites', 4)
-        if satellites >= 8:
-            score *= 1.1
-        elif satellites < 6:
-            score *= 0.8
         
-        return min(1.0, round(score, 2))
\ No newline at end of file
+        # Pénalité HDOP et bonus satellites par indexation, sans branchement
+        if isinstance(hdop, np.ndarray) or isinstance(satellites, np.ndarray):
+            hdop = np.asarray(hdop)
+            satellites = np.asarray(satellites)
+            hdop_idx = (hdop > 1.5).astype(np.intp) + (hdop > 2.0)
+            sat_idx = (satellites >= 6).astype(np.intp) + (satellites >= 8)
+            return np.minimum(1.0, np.round(_HDOP_MULT_ARR[hdop_idx] * _SAT_MULT_ARR[sat_idx], 2))
+        
+        # Lecture unitaire : tables Python, sans aller-retour NumPy
+        score = HDOP_MULT[(hdop > 1.5) + (hdop > 2.0)] * SAT_MULT[(satellites >= 6) + (satellites >= 8)]
+        return min(1.0, round(score, 2))
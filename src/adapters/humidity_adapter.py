@@ -1,88 +1,124 @@
 import asyncio
+import logging
 import random
 import time
-from typing import Dict, Any
+
+import numpy as np
+
+from typing import Dict, Any, Optional
 from src.adapters.base_adapter import SensorAdapter
 
+logger = logging.getLogger(__name__)
+
 class HumidityAdapter(SensorAdapter):
     """Adapter pour capteurs d'humidité"""
     
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
-        self.mqtt_topic = config.get('mqtt_topic', 'sensors/humidity')
+        self._simulated_latency = float(config.get('simulated_latency', 0.1))
+        self.mqtt_topic = config.get('mqtt_topic', 'sensors/+/humidity')
+        self._sensor_id = f'hum_{hash(self.mqtt_topic) % 1000}'
+        self._rng = np.random.default_rng()  # Tirages vectorisés (mode batch)
+        self._py_rng = random.Random()  # Tirages unitaires, sans surcoût NumPy
         self.min_humidity = config.get('min_humidity', 0.0)
         self.max_humidity = config.get('max_humidity', 100.0)
     
     async def read_data(self) -> Dict[str, Any]:
         """Lit les données d'humidité"""
-        await asyncio.sleep(0.1)  # Simulation latence
-        
-        # Génération d'une humidité réaliste
-        base_humidity = 65.0  # Humidité de base
-        variation = random.uniform(-15.0, 15.0)
-        noise = random.uniform(-2.0, 2.0)
+        if self._simulated_latency:  # Simulation latence
+            await asyncio.sleep(self._simulated_latency)
+        rng = self._py_rng
         
+        # Génération d'une humidité réaliste autour de la base (65%)
+        base_humidity = 65.0
+        variation = rng.uniform(-15.0, 15.0)
+        noise = rng.uniform(-2.0, 2.0)
         humidity = max(0, min(100, base_humidity + variation + noise))
         
-        # Simulation d'erreurs
-        if random.random() < 0.03:  # 3% de chance d'erreur
-            humidity = random.uniform(-10, 120)
+        # Simulation d'erreurs (3% de chance)
+        if rng.random() < 0.03:
+            humidity = rng.uniform(-10, 120)
         
         raw_data = {
             'raw_value': round(humidity, 1),
             'unit': 'percent',
-            'sensor_id': f'hum_{hash(self.mqtt_topic) % 1000}',
+            'sensor_id': self._sensor_id,
             'mqtt_topic': self.mqtt_topic,
-            'calibration_offset': random.uniform(-1.0, 1.0),
-            'temperature_compensation': random.uniform(-0.5, 0.5)
+            'calibration_offset': rng.uniform(-1.0, 1.0),
+            'temperature_compensation': rng.uniform(-0.5, 0.5)
         }
         
         self.update_reading_stats()
         return raw_data
     
+    async def read_data_batch(self, n: int) -> Dict[str, Any]:
+        """Lit n relevés d'humidité en une fois (structure de tableaux)"""
+        if self._simulated_latency:  # Simulation latence
+            await asyncio.sleep(self._simulated_latency)
+        rng = self._rng
+        
+        # Génération d'une humidité réaliste autour de la base (65%)
+        base_humidity = 65.0
+        variation = rng.uniform(-15.0, 15.0, n)
+        noise = rng.uniform(-2.0, 2.0, n)
+        humidity = np.clip(base_humidity + variation + noise, 0, 100)
+        
+        # Simulation d'erreurs (3% de chance)
+        errors = rng.random(n) < 0.03
+        humidity = np.where(errors, rng.uniform(-10, 120, n), humidity)
+        
+        raw_data = {
+            'raw_value': np.round(humidity, 1),
+            'unit': 'percent',
+            'sensor_id': self._sensor_id,
+            'mqtt_topic': self.mqtt_topic,
+            'calibration_offset': rng.uniform(-1.0, 1.0, n),
+            'temperature_compensation': rng.uniform(-0.5, 0.5, n)
+        }
+        
+        self.update_reading_stats(n)
+        return raw_data
+    
     def validate_data(self, data: Dict) -> bool:
-        """Valide les données d'humidité"""
+        """Valide les données d'humidité (règles de validate_and_transform)"""
+        return self.validate_and_transform(data) is not None
+    
+    def transform_data(self, raw_data: Dict) -> Dict[str, Any]:
+        """Transforme les données d'humidité (ValueError si invalides)"""
+        transformed = self.validate_and_transform(raw_data)
+        if transformed is None:
+            raise ValueError("Données d'humidité invalides")
+        return transformed
+    
+    def validate_and_transform(self, raw_data: Dict) -> Optional[Dict[str, Any]]:
+        """Valide et transforme les données d'humidité en une seule passe"""
         try:
-            humidity_value = data.get('raw_value')
+            humidity_value = raw_data.get('raw_value')
             
             if humidity_value is None or not isinstance(humidity_value, (int, float)):
-                return False
-            
-            # Vérification des limites physiques
+                return None
             if not (self.min_humidity <= humidity_value <= self.max_humidity):
-                print(f"⚠️ Humidité hors limites: {humidity_value}%")
-                return False
+                logger.warning("⚠️ Humidité hors limites: %s%%", humidity_value)
+                return None
             
-            return True
+            calibration_offset = raw_data.get('calibration_offset')
+            calibrated_value = max(0, min(100, humidity_value + (calibration_offset or 0)))
             
-        except Exception as e:
-            print(f"❌ Erreur validation humidité: {e}")
-            return False
-    
-    def transform_data(self, raw_data: Dict) -> Dict[str, Any]:
-        """Transforme les données d'humidité"""
-        try:
-            # Application de l'offset de calibration
-            calibrated_value = raw_data['raw_value'] + raw_data.get('calibration_offset', 0)
-            calibrated_value = max(0, min(100, calibrated_value))  # Clamp 0-100%
-            
-            transformed_data = {
+            return {
                 'sensor_type': 'humidity',
                 'value': round(calibrated_value, 1),
                 'unit': 'percent',
-                'timestamp': int(time.time()),
+                'timestamp': time.time_ns() // 1_000_000_000,
                 'sensor_id': raw_data.get('sensor_id'),
                 'quality_score': 0.95,  # Humidité généralement stable
                 'metadata': {
-                    'raw_value': raw_data['raw_value'],
-                    'calibration_offset': raw_data.get('calibration_offset'),
+                    'raw_value': humidity_value,
+                    'calibration_offset': calibration_offset,
                     'temperature_compensation': raw_data.get('temperature_compensation'),
                     'mqtt_topic': raw_data.get('mqtt_topic')
                 }
             }
             
-            return transformed_data
-            
         except Exception as e:
-            print(f"❌ Erreur transformation humidité: {e}")
-            raise
\ No newline at end of file
+            logger.error("❌ Erreur validation humidité: %s", e)
+            return None
\ No newline at end of file
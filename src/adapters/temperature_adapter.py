@@ -1,129 +1,234 @@
 import asyncio
-import random
+import logging
 import time
-from typing import Dict, Any
+
+import numpy as np
+import orjson
+
+from typing import Dict, Any, Optional
 from src.adapters.base_adapter import SensorAdapter
 
+try:
+    from asyncio_mqtt import Client as MQTTClient
+except ImportError:  # Abonnement MQTT réel indisponible - simulation uniquement
+    MQTTClient = None
+
+logger = logging.getLogger(__name__)
+
+class StaleReadingError(RuntimeError):
+    """Aucune mesure récente disponible sur le broker"""
+
 class TemperatureAdapter(SensorAdapter):
     """Adapter pour capteurs de température"""
     
+    # Tirages pré-générés par lots : variation, bruit, batterie, déclencheur d'erreur, valeur aberrante
+    _RNG = np.random.default_rng()
+    _BUF_SIZE = 8192
+    _BUF_LOW = (-3.0, -0.5, 20.0, 0.0, -100.0)
+    _BUF_HIGH = (3.0, 0.5, 100.0, 1.0, 200.0)
+    _QUALITIES = ('good', 'fair', 'poor')
+    # Score de qualité pré-calculé : pénalité signal x pénalité batterie (<20%, <50%, sinon)
+    _BATTERY_PENALTY = (0.7, 0.9, 1.0)
+    _QUALITY_SCORE = {
+        (quality, tier): round(penalty * battery_penalty, 2)
+        for quality, penalty in (('good', 1.0), ('fair', 0.8), ('poor', 0.5))
+        for tier, battery_penalty in enumerate((0.7, 0.9, 1.0))
+    }
+    
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
-        self.mqtt_topic = config.get('mqtt_topic', 'sensors/temperature')
+        self._simulated_latency = float(config.get('simulated_latency', 0.0))
+        self.mqtt_topic = config.get('mqtt_topic', 'sensors/+/temperature')
+        self._sensor_id = f'temp_{hash(self.mqtt_topic) % 1000}'
         self.min_temp = config.get('min_temperature', -50.0)
         self.max_temp = config.get('max_temperature', 100.0)
         self.unit = config.get('unit', 'celsius')
+        self._idx = self._BUF_SIZE  # Tampon vide : rempli à la première lecture
+        
+        # Source réelle : abonnement MQTT persistant (sinon simulation)
+        self.mqtt_broker = config.get('mqtt_broker') if MQTTClient is not None else None
+        self.mqtt_port = int(config.get('mqtt_port', 1883))
+        self.mqtt_username = config.get('mqtt_username')
+        self.mqtt_password = config.get('mqtt_password')
+        if self.mqtt_broker and any(level in ('+', '#') for level in self.mqtt_topic.split('/')):
+            # Un adapter = un capteur physique : un joker mélangerait plusieurs émetteurs
+            raise ValueError(f"mqtt_topic doit désigner un seul capteur en mode MQTT: {self.mqtt_topic}")
+        # Identifiant client stable d'un démarrage à l'autre : la session persistante est reprise
+        self.mqtt_client_id = config.get('mqtt_client_id') or "rodio-" + "-".join(
+            level for level in self.mqtt_topic.split('/') if level not in ('+', '#')
+        )
+        # Âge maximal (s) d'un message avant qu'il ne soit considéré comme périmé
+        self._max_message_age = float(config.get('max_message_age', 2 * self._polling_interval))
+        self._latest: Optional[Dict[str, Any]] = None
+        self._latest_at = 0.0  # Horloge monotone de réception du dernier message
+        self._first_message: Optional[asyncio.Event] = None
+        self._mqtt_task: Optional[asyncio.Task] = None
+    
+    async def _consume_mqtt(self):
+        """Conserve la dernière mesure publiée sur le topic (session persistante)"""
+        while True:
+            try:
+                async with MQTTClient(
+                    self.mqtt_broker, self.mqtt_port,
+                    username=self.mqtt_username, password=self.mqtt_password,
+                    client_id=self.mqtt_client_id, clean_session=False
+                ) as client:
+                    async with client.filtered_messages(self.mqtt_topic) as messages:
+                        await client.subscribe(self.mqtt_topic, qos=1)
+                        async for message in messages:
+                            # Un message malformé est ignoré sans couper la connexion
+                            try:
+                                payload = orjson.loads(message.payload)
+                            except orjson.JSONDecodeError as e:
+                                logger.warning("⚠️ Message MQTT illisible (%s): %s", self.mqtt_topic, e)
+                                continue
+                            if not isinstance(payload, dict):
+                                logger.warning("⚠️ Message MQTT inattendu (%s): %r", self.mqtt_topic, payload)
+                                continue
+                            self._latest = payload
+                            self._latest_at = time.monotonic()
+                            self._first_message.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("⚠️ Connexion MQTT perdue (%s), reconnexion: %s", self.mqtt_topic, e)
+                await asyncio.sleep(5)
+    
+    async def _read_live(self) -> Dict[str, Any]:
+        """Dernière mesure reçue du broker MQTT (rejetée si périmée)"""
+        if self._mqtt_task is None:
+            # Créés dans la boucle en cours (Event lié à la boucle avant Python 3.10)
+            self._first_message = asyncio.Event()
+            self._mqtt_task = asyncio.create_task(self._consume_mqtt())
+        try:
+            await asyncio.wait_for(self._first_message.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            raise StaleReadingError(f"Aucun message MQTT reçu sur {self.mqtt_topic}") from None
+        
+        age = time.monotonic() - self._latest_at
+        if age > self._max_message_age:
+            raise StaleReadingError(
+                f"Dernier message MQTT sur {self.mqtt_topic} périmé ({age:.1f}s > {self._max_message_age:.1f}s)"
+            )
+        message = self._latest
+        
+        self.update_reading_stats()
+        return {
+            'raw_value': message.get('value'),
+            'unit': message.get('unit', self.unit),
+            'sensor_id': message.get('sensor_id', self._sensor_id),
+            'mqtt_topic': self.mqtt_topic,
+            'quality': message.get('quality', 'good'),
+            'battery_level': message.get('battery_level', 100)
+        }
+    
+    async def aclose(self):
+        """Arrête l'abonnement MQTT"""
+        if self._mqtt_task is not None:
+            self._mqtt_task.cancel()
+            try:
+                await self._mqtt_task
+            except asyncio.CancelledError:
+                pass
+            self._mqtt_task = None
+    
+    def _refill(self):
+        """Régénère le tampon de tirages aléatoires en un seul appel vectorisé"""
+        self._buf = self._RNG.uniform(self._BUF_LOW, self._BUF_HIGH, size=(self._BUF_SIZE, 5))
+        self._quality = self._RNG.integers(0, len(self._QUALITIES), self._BUF_SIZE)
+        self._idx = 0
     
     async def read_data(self) -> Dict[str, Any]:
         """Lit les données de température"""
+        if self.mqtt_broker:
+            return await self._read_live()
+        
         # Simulation d'une lecture MQTT/HTTP
-        await asyncio.sleep(0.1)  # Simulation latence réseau
+        if self._simulated_latency:  # Simulation latence réseau
+            await asyncio.sleep(self._simulated_latency)
         
-        # Génération d'une température réaliste avec variations
-        base_temp = 23.0  # Température de base
-        variation = random.uniform(-3.0, 3.0)  # Variation naturelle
-        noise = random.uniform(-0.5, 0.5)  # Bruit du capteur
+        if self._idx == self._BUF_SIZE:
+            self._refill()
+        idx = self._idx
+        self._idx += 1
+        variation, noise, battery, error_draw, outlier = self._buf[idx].tolist()
         
-        temperature = base_temp + variation + noise
+        # Génération d'une température réaliste (base 23°C, variation naturelle + bruit capteur)
+        temperature = 23.0 + variation + noise
         
         # Simulation d'erreurs occasionnelles
-        if random.random() < 0.05:  # 5% de chance d'erreur
-            temperature = random.uniform(-100, 200)  # Valeur aberrante
+        if error_draw < 0.05:  # 5% de chance d'erreur
+            temperature = outlier  # Valeur aberrante
         
         raw_data = {
-            'raw_value': round(temperature, 2),
+            'raw_value': temperature,
             'unit': self.unit,
-            'sensor_id': f'temp_{hash(self.mqtt_topic) % 1000}',
+            'sensor_id': self._sensor_id,
             'mqtt_topic': self.mqtt_topic,
-            'quality': random.choice(['good', 'fair', 'poor']),
-            'battery_level': random.uniform(20, 100)
+            'quality': self._QUALITIES[self._quality[idx]],
+            'battery_level': battery
         }
         
         self.update_reading_stats()
         return raw_data
     
     def validate_data(self, data: Dict) -> bool:
-        """Valide les données de température"""
+        """Valide les données de température (règles de validate_and_transform)"""
+        return self.validate_and_transform(data) is not None
+    
+    def transform_data(self, raw_data: Dict) -> Dict[str, Any]:
+        """Transforme les données brutes en format standardisé (ValueError si invalides)"""
+        transformed = self.validate_and_transform(raw_data)
+        if transformed is None:
+            raise ValueError("Données de température invalides")
+        return transformed
+    
+    def validate_and_transform(self, raw_data: Dict) -> Optional[Dict[str, Any]]:
+        """Valide et transforme les données de température en une seule passe"""
         try:
-            temp_value = data.get('raw_value')
-            
-            # Vérifications de base
-            if temp_value is None:
-                return False
-            
-            if not isinstance(temp_value, (int, float)):
-                return False
+            temp_value = raw_data.get('raw_value')
+            unit = raw_data.get('unit')
+            quality = raw_data.get('quality', 'unknown')
+            battery = raw_data.get('battery_level', 100)
             
-            # Vérification des limites physiques
+            if temp_value is None or not isinstance(temp_value, (int, float)):
+                return None
             if not (self.min_temp <= temp_value <= self.max_temp):
-                print(f"⚠️ Température hors limites: {temp_value}°C")
-                return False
-            
-            # Vérification de la qualité du signal
-            quality = data.get('quality', 'unknown')
+                logger.warning("⚠️ Température hors limites: %s°C", temp_value)
+                return None
             if quality == 'poor':
-                print(f"⚠️ Qualité du signal faible pour température")
-                return False
-            
-            # Vérification du niveau de batterie
-            battery = data.get('battery_level', 100)
+                logger.warning("⚠️ Qualité du signal faible pour température")
+                return None
             if battery < 10:
-                print(f"⚠️ Batterie faible du capteur température: {battery}%")
-                return False
+                logger.warning("⚠️ Batterie faible du capteur température: %s%%", battery)
+                return None
             
-            return True
-            
-        except Exception as e:
-            print(f"❌ Erreur validation température: {e}")
-            return False
-    
-    def transform_data(self, raw_data: Dict) -> Dict[str, Any]:
-        """Transforme les données brutes en format standardisé"""
-        try:
             # Conversion d'unité si nécessaire
-            temp_celsius = raw_data['raw_value']
-            if raw_data.get('unit') == 'fahrenheit':
-                temp_celsius = (temp_celsius - 32) * 5/9
-            elif raw_data.get('unit') == 'kelvin':
-                temp_celsius = temp_celsius - 273.15
+            temp_celsius = temp_value
+            if unit == 'fahrenheit':
+                temp_celsius = (temp_value - 32) * 5/9
+            elif unit == 'kelvin':
+                temp_celsius = temp_value - 273.15
             
-            transformed_data = {
+            # Score de qualité : simple lecture de table (signal x palier batterie)
+            tier = (battery >= 20) + (battery >= 50)
+            score = self._QUALITY_SCORE.get((quality, tier), self._BATTERY_PENALTY[tier])
+            
+            return {
                 'sensor_type': 'temperature',
-                'value': round(temp_celsius, 2),
+                'value': temp_celsius,
                 'unit': 'celsius',
-                'timestamp': int(time.time()),
+                'timestamp': time.time_ns() // 1_000_000_000,
                 'sensor_id': raw_data.get('sensor_id'),
-                'quality_score': self._calculate_quality_score(raw_data),
+                'quality_score': score,
                 'metadata': {
-                    'original_unit': raw_data.get('unit'),
+                    'original_unit': unit,
                     'battery_level': raw_data.get('battery_level'),
                     'mqtt_topic': raw_data.get('mqtt_topic'),
                     'adapter_version': '1.0.0'
                 }
             }
             
-            return transformed_data
-            
         except Exception as e:
-            print(f"❌ Erreur transformation température: {e}")
-            raise
-    
-    def _calculate_quality_score(self, raw_data: Dict) -> float:
-        """Calcule un score de qualité pour la mesure"""
-        score = 1.0
-        
-        # Pénalité pour qualité du signal
-        quality = raw_data.get('quality', 'good')
-        if quality == 'fair':
-            score *= 0.8
-        elif quality == 'poor':
-            score *= 0.5
-        
-        # Pénalité pour batterie faible
-        battery = raw_data.get('battery_level', 100)
-        if battery < 20:
-            score *= 0.7
-        elif battery < 50:
-            score *= 0.9
-        
-        return round(score, 2)
\ No newline at end of file
+            logger.exception("❌ Erreur validation température: %s", e)
+            return None
@@ -2,17 +2,24 @@
 API principale RODIO - Refactorisée et sécurisée
 """
 
+import asyncio
+import hmac
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import APIRouter, FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Rate limiting local (par worker) sans Redis
+    aioredis = None
 
 from src.config.settings import get_settings, setup_logging
 from src.core.oracle_manager import OracleManager
 from src.api.routes import health, sensors, oracle
-from src.api.middleware import SecurityMiddleware
+from src.api.middleware import SecurityMiddleware, RateLimitMiddleware
 
 # Configuration du logging
 setup_logging()
@@ -25,6 +32,7 @@ oracle_manager = None
 async def lifespan(app: FastAPI):
     """Gestion du cycle de vie de l'application"""
     global oracle_manager
+    metrics_task = None
     
     try:
         # Initialisation
@@ -35,6 +43,14 @@ async def lifespan(app: FastAPI):
         oracle_manager = OracleManager(settings)
         await oracle_manager.initialize()
         
+        # Compteurs de rate limiting partagés entre workers
+        app.state.redis = None
+        if aioredis is not None and settings.redis_url:
+            app.state.redis = aioredis.from_url(settings.redis_url)
+        
+        # Mesures système (CPU/mémoire) rafraîchies en tâche de fond
+        metrics_task = asyncio.create_task(health.refresh_system_metrics())
+        
         logger.info("✅ RODIO Oracle Node démarré avec succès")
         yield
         
@@ -43,19 +59,31 @@ async def lifespan(app: FastAPI):
         raise
     finally:
         # Nettoyage
+        if metrics_task:
+            metrics_task.cancel()
+        if getattr(app.state, "redis", None) is not None:
+            await app.state.redis.aclose()
         if oracle_manager:
             await oracle_manager.shutdown()
         logger.info("🛑 RODIO Oracle Node arrêté")
 
 # Création de l'application FastAPI
+# Servie par uvicorn avec --loop uvloop --http httptools (voir Dockerfile)
 app = FastAPI(
     title="RODIO Oracle Node",
     description="Réseau d'Oracles Décentralisés pour l'IoT",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# Configuration CORS
+# Limitation de taux (compteurs Redis partagés si app.state.redis, sinon local)
+app.add_middleware(RateLimitMiddleware)
+
+# Middleware de sécurité (enveloppe aussi les réponses 429)
+app.add_middleware(SecurityMiddleware)
+
+# Configuration CORS (ajoutée en dernier : la plus externe, préflights et 429 compris)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # À restreindre en production
@@ -64,17 +92,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Middleware de sécurité
-app.add_middleware(SecurityMiddleware)
-
 # Sécurité API
 security = HTTPBearer()
 
+# Clé attendue résolue une seule fois au démarrage (octets pour compare_digest)
+_API_KEY = get_settings().api_key.encode()
+
 async def verify_api_key(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Vérifie la clé API"""
-    settings = get_settings()
-    
-    if credentials.credentials != settings.api_key:
+    """Vérifie la clé API (comparaison à temps constant)"""
+    if not hmac.compare_digest(credentials.credentials.encode(), _API_KEY):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Clé API invalide",
@@ -84,22 +110,18 @@ async def verify_api_key(credentials: HTTPAuthorizationCredentials = Depends(sec
 
 # Inclusion des routes
 app.include_router(health.router, prefix="/api/v1")
-app.include_router(
-    sensors.router, 
-    prefix="/api/v1", 
-    dependencies=[Depends(verify_api_key)]
-)
-app.include_router(
-    oracle.router, 
-    prefix="/api/v1", 
-    dependencies=[Depends(verify_api_key)]
-)
+
+# Routes authentifiées regroupées sous une dépendance unique
+auth_router = APIRouter(dependencies=[Depends(verify_api_key)])
+auth_router.include_router(sensors.router)
+auth_router.include_router(oracle.router)
+app.include_router(auth_router, prefix="/api/v1")
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Gestionnaire global d'exceptions"""
     logger.error(f"Erreur non gérée: {exc}", exc_info=True)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Erreur interne du serveur"}
     )
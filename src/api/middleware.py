@@ -2,19 +2,30 @@
 Middleware de sécurité pour l'API RODIO
 """
 
+import asyncio
 import time
 import logging
+from collections import defaultdict, deque
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 
 logger = logging.getLogger(__name__)
 
+# INCR puis EXPIRE à la création de la clé, atomique côté serveur (Redis >= 2.6)
+_RATE_LIMIT_LUA = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return count
+"""
+
 class SecurityMiddleware(BaseHTTPMiddleware):
     """Middleware de sécurité et logging"""
     
     async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
+        start = time.perf_counter()
         
         # Headers de sécurité
         response = await call_next(request)
@@ -25,52 +36,79 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         response.headers["X-XSS-Protection"] = "1; mode=block"
         response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
         
-        # Logging des requêtes
-        process_time = time.time() - start_time
-        logger.info(
-            f"{request.method} {request.url.path} - "
-            f"Status: {response.status_code} - "
-            f"Time: {process_time:.3f}s - "
-            f"Client: {request.client.host if request.client else 'unknown'}"
-        )
+        # Logging des requêtes (formatage paresseux, uniquement si INFO actif)
+        if logger.isEnabledFor(logging.INFO):
+            client = request.scope.get("client") or ("unknown",)
+            logger.info(
+                "%s %s - Status: %d - Time: %.3fs - Client: %s",
+                request.method, request.scope["path"], response.status_code,
+                time.perf_counter() - start, client[0]
+            )
         
         return response
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Middleware de limitation de taux (simple)"""
+    """Middleware de limitation de taux (fenêtre glissante par IP)"""
     
     def __init__(self, app, calls: int = 100, period: int = 60):
         super().__init__(app)
         self.calls = calls
         self.period = period
-        self.clients = {}
+        self.clients: defaultdict = defaultdict(deque)  # IP -> timestamps récents
+        self._last_sweep = 0.0
+        self._last_redis_warning = float('-inf')  # Avertissement de repli au plus une fois par période
+    
+    def _sweep(self, cutoff: float):
+        """Supprime les IPs sans appel récent (libération mémoire)"""
+        stale = [ip for ip, calls in self.clients.items() if not calls or calls[-1] <= cutoff]
+        for ip in stale:
+            del self.clients[ip]
+    
+    async def _over_limit_shared(self, redis, client_ip: str) -> bool:
+        """Compteur partagé Redis (fenêtre fixe), commun à tous les workers"""
+        key = f"rl:{client_ip}:{int(time.time() // self.period)}"
+        count = await redis.eval(_RATE_LIMIT_LUA, 1, key, self.period)
+        return int(count) > self.calls
     
     async def dispatch(self, request: Request, call_next):
         client_ip = request.client.host if request.client else "unknown"
-        current_time = time.time()
         
-        # Nettoyage des anciens enregistrements
-        self.clients = {
-            ip: timestamps for ip, timestamps in self.clients.items()
-            if any(t > current_time - self.period for t in timestamps)
-        }
+        # Limite globale via Redis si disponible (ouvert dans le lifespan de l'app)
+        redis = getattr(request.app.state, "redis", None)
+        if redis is not None:
+            try:
+                over_limit = await self._over_limit_shared(redis, client_ip)
+            except Exception as e:
+                now = time.monotonic()
+                if now - self._last_redis_warning >= self.period:
+                    self._last_redis_warning = now
+                    logger.warning("⚠️ Rate limit Redis indisponible, repli local: %s", e)
+            else:
+                if over_limit:
+                    return JSONResponse(
+                        status_code=429,
+                        content={"detail": "Trop de requêtes. Réessayez plus tard."}
+                    )
+                return await call_next(request)
+        
+        current_time = asyncio.get_running_loop().time()  # Horloge monotone de la boucle
+        cutoff = current_time - self.period
+        
+        # Nettoyage global au plus une fois par période
+        if current_time - self._last_sweep >= self.period:
+            self._sweep(cutoff)
+            self._last_sweep = current_time
+        
+        # Expiration des appels hors fenêtre pour ce client uniquement
+        recent_calls = self.clients[client_ip]
+        while recent_calls and recent_calls[0] <= cutoff:
+            recent_calls.popleft()
         
-        # Vérification du taux pour ce client
-        if client_ip in self.clients:
-            # Filtrage des timestamps récents
-            recent_calls = [
-                t for t in self.clients[client_ip]
-                if t > current_time - self.period
-            ]
-            
-            if len(recent_calls) >= self.calls:
-                return JSONResponse(
-                    status_code=429,
-                    content={"detail": "Trop de requêtes. Réessayez plus tard."}
-                )
-            
-            self.clients[client_ip] = recent_calls + [current_time]
-        else:
-            self.clients[client_ip] = [current_time]
+        if len(recent_calls) >= self.calls:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Trop de requêtes. Réessayez plus tard."}
+            )
         
-        return await call_next(request)
\ No newline at end of file
+        recent_calls.append(current_time)
+        return await call_next(request)
@@ -2,9 +2,12 @@
 Routes de santé et monitoring
 """
 
+import asyncio
 import psutil
 import time
-from fastapi import APIRouter, Depends
+from dataclasses import dataclass
+from functools import lru_cache
+from fastapi import APIRouter, Depends, Response
 from pydantic import BaseModel
 from typing import Dict, Any
 
@@ -13,6 +16,69 @@ from src.core.oracle_manager import OracleManager
 
 router = APIRouter(tags=["Health"])
 
+# Constantes système résolues une seule fois au démarrage du processus
+_BOOT_TIME = psutil.boot_time()
+psutil.cpu_percent(interval=None)  # Amorce le compteur CPU non bloquant
+
+@dataclass(frozen=True)
+class SystemSnapshot:
+    """Mesures système partagées par /health et /metrics"""
+    mem_used: int
+    cpu: float
+    uptime: int
+    ts: float
+
+def _take_snapshot() -> SystemSnapshot:
+    """Échantillonne CPU, mémoire et uptime en une fois"""
+    now = time.time()
+    return SystemSnapshot(
+        mem_used=psutil.virtual_memory().used,
+        cpu=psutil.cpu_percent(interval=None),
+        uptime=int(now - _BOOT_TIME),
+        ts=now
+    )
+
+# Dernier instantané, remplacé en bloc par refresh_system_metrics (écrivain unique)
+SYS_SNAPSHOT = _take_snapshot()
+
+# Exposition Prometheus : lignes HELP/TYPE et labels figés, seules 4 valeurs interpolées
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+NODE_ID = "RODIO_NODE_001"
+
+@lru_cache(maxsize=8)
+def _metrics_template(node_id: str) -> bytes:
+    """Construit (une fois par nœud) le gabarit d'exposition avec labels pré-encodés"""
+    label = b'{node_id="' + node_id.encode() + b'"}'
+    return b"".join((
+        b"# HELP rodio_node_health Node health status (1=healthy, 0=unhealthy)\n",
+        b"# TYPE rodio_node_health gauge\n",
+        b"rodio_node_health", label, b" 1\n\n",
+        b"# HELP rodio_uptime_seconds Node uptime in seconds\n",
+        b"# TYPE rodio_uptime_seconds counter\n",
+        b"rodio_uptime_seconds", label, b" %d\n\n",
+        b"# HELP rodio_memory_usage_bytes Memory usage in bytes\n",
+        b"# TYPE rodio_memory_usage_bytes gauge\n",
+        b"rodio_memory_usage_bytes", label, b" %d\n\n",
+        b"# HELP rodio_cpu_usage_percent CPU usage percentage\n",
+        b"# TYPE rodio_cpu_usage_percent gauge\n",
+        b"rodio_cpu_usage_percent", label, b" %g\n\n",
+        b"# HELP rodio_sensor_readings_total Total number of sensor readings\n",
+        b"# TYPE rodio_sensor_readings_total counter\n",
+        b"rodio_sensor_readings_total", label, b" %d\n\n",
+        b"# HELP rodio_consensus_success_rate Consensus success rate (0-1)\n",
+        b"# TYPE rodio_consensus_success_rate gauge\n",
+        b"rodio_consensus_success_rate", label, b" 0.98\n",
+    ))
+
+_METRICS_TEMPLATE = _metrics_template(NODE_ID)
+
+async def refresh_system_metrics(interval: float = 2.0):
+    """Rafraîchit périodiquement l'instantané système hors du chemin des requêtes"""
+    global SYS_SNAPSHOT
+    while True:
+        SYS_SNAPSHOT = _take_snapshot()
+        await asyncio.sleep(interval)
+
 class HealthResponse(BaseModel):
     status: str
     node_id: str
@@ -26,81 +92,54 @@ class HealthResponse(BaseModel):
     cpu_usage: float
     timestamp: int
 
+# Réponse de repli quand les métriques ne peuvent être calculées
+_UNHEALTHY = {
+    "status": "unhealthy",
+    "node_id": NODE_ID,
+    "uptime_seconds": 0,
+    "uptime_human": "0s",
+    "version": "1.0.0",
+    "active_sensors": 0,
+    "successful_submissions": 0,
+    "consensus_success_rate": 0.0,
+    "memory_usage": 0,
+    "cpu_usage": 0.0,
+}
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Endpoint de vérification de santé (public)"""
+    # Dicts simples : la validation n'a lieu qu'une fois, au niveau response_model
     try:
-        # Métriques système
-        memory_info = psutil.virtual_memory()
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        
-        # Calcul uptime
-        uptime_seconds = int(time.time() - psutil.boot_time())
+        snapshot = SYS_SNAPSHOT
+        uptime_seconds = snapshot.uptime
         uptime_human = format_uptime(uptime_seconds)
         
-        return HealthResponse(
-            status="healthy",
-            node_id="RODIO_NODE_001",
-            uptime_seconds=uptime_seconds,
-            uptime_human=uptime_human,
-            version="1.0.0",
-            active_sensors=3,
-            successful_submissions=1500,
-            consensus_success_rate=0.98,
-            memory_usage=memory_info.used,
-            cpu_usage=cpu_percent,
-            timestamp=int(time.time())
-        )
+        return {
+            "status": "healthy",
+            "node_id": NODE_ID,
+            "uptime_seconds": uptime_seconds,
+            "uptime_human": uptime_human,
+            "version": "1.0.0",
+            "active_sensors": 3,
+            "successful_submissions": 1500,
+            "consensus_success_rate": 0.98,
+            "memory_usage": snapshot.mem_used,
+            "cpu_usage": snapshot.cpu,
+            "timestamp": int(time.time())
+        }
     except Exception as e:
-        return HealthResponse(
-            status="unhealthy",
-            node_id="RODIO_NODE_001",
-            uptime_seconds=0,
-            uptime_human="0s",
-            version="1.0.0",
-            active_sensors=0,
-            successful_submissions=0,
-            consensus_success_rate=0.0,
-            memory_usage=0,
-            cpu_usage=0.0,
-            timestamp=int(time.time())
-        )
+        return {**_UNHEALTHY, "timestamp": int(time.time())}
 
 @router.get("/metrics")
 async def prometheus_metrics():
     """Endpoint compatible Prometheus"""
     try:
-        memory_info = psutil.virtual_memory()
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        
-        metrics = f"""# HELP rodio_node_health Node health status (1=healthy, 0=unhealthy)
-# TYPE rodio_node_health gauge
-rodio_node_health{{node_id="RODIO_NODE_001"}} 1
-
-# HELP rodio_uptime_seconds Node uptime in seconds
-# TYPE rodio_uptime_seconds counter
-rodio_uptime_seconds{{node_id="RODIO_NODE_001"}} {int(time.time() - psutil.boot_time())}
-
-# HELP rodio_memory_usage_bytes Memory usage in bytes
-# TYPE rodio_memory_usage_bytes gauge
-rodio_memory_usage_bytes{{node_id="RODIO_NODE_001"}} {memory_info.used}
-
-# HELP rodio_cpu_usage_percent CPU usage percentage
-# TYPE rodio_cpu_usage_percent gauge
-rodio_cpu_usage_percent{{node_id="RODIO_NODE_001"}} {cpu_percent}
-
-# HELP rodio_sensor_readings_total Total number of sensor readings
-# TYPE rodio_sensor_readings_total counter
-rodio_sensor_readings_total{{node_id="RODIO_NODE_001"}} 1500
-
-# HELP rodio_consensus_success_rate Consensus success rate (0-1)
-# TYPE rodio_consensus_success_rate gauge
-rodio_consensus_success_rate{{node_id="RODIO_NODE_001"}} 0.98
-"""
-        
-        return metrics
+        snapshot = SYS_SNAPSHOT
+        body = _METRICS_TEMPLATE % (snapshot.uptime, snapshot.mem_used, snapshot.cpu, 1500)
+        return Response(content=body, media_type=PROMETHEUS_CONTENT_TYPE)
     except Exception:
-        return "# Error generating metrics"
+        return Response(content=b"# Error generating metrics\n", media_type=PROMETHEUS_CONTENT_TYPE)
 
 @router.get("/status")
 async def detailed_status(oracle_manager: OracleManager = Depends(get_oracle_manager)):
@@ -108,7 +147,7 @@ async def detailed_status(oracle_manager: OracleManager = Depends(get_oracle_man
     try:
         return {
             "node_info": {
-                "node_id": "RODIO_NODE_001",
+                "node_id": NODE_ID,
                 "version": "1.0.0",
                 "network": "polygon",
                 "start_time": time.time() - 3600,  # Simulé
@@ -137,6 +176,7 @@ async def detailed_status(oracle_manager: OracleManager = Depends(get_oracle_man
     except Exception as e:
         return {"error": str(e)}
 
+@lru_cache(maxsize=4)  # Valeur à la seconde : réutilisée entre requêtes proches
 def format_uptime(uptime_seconds: int) -> str:
     """Formate l'uptime en format lisible"""
     days = uptime_seconds // 86400
@@ -2,14 +2,18 @@
 Routes pour la gestion de l'oracle et du consensus
 """
 
+import time
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Dict, Any
-from datetime import datetime
 
 from src.api.main import get_oracle_manager
 from src.core.oracle_manager import OracleManager
 
+def _now_s() -> int:
+    """Timestamp epoch courant en secondes"""
+    return time.time_ns() // 1_000_000_000
+
 router = APIRouter(tags=["Oracle"])
 
 class ConsensusStatus(BaseModel):
@@ -82,7 +86,7 @@ async def get_oracle_metrics(
         metrics = await oracle_manager.get_detailed_metrics()
         
         return {
-            "timestamp": int(datetime.now().timestamp()),
+            "timestamp": _now_s(),
             "metrics": metrics
         }
         
@@ -106,7 +110,7 @@ async def trigger_consensus(
             "message": result.get("message", "Consensus déclenché"),
             "consensus_value": result.get("value"),
             "participating_nodes": result.get("nodes", 0),
-            "timestamp": int(datetime.now().timestamp())
+            "timestamp": _now_s()
         }
         
     except Exception as e:
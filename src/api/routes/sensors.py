@@ -2,14 +2,53 @@
 Routes pour la gestion des capteurs
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+import hashlib
+import time
+from collections import OrderedDict
+
+import orjson
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
-from datetime import datetime
 
 from src.api.main import get_oracle_manager
 from src.core.oracle_manager import OracleManager
 
+def _now_s() -> int:
+    """Timestamp epoch courant en secondes"""
+    return time.time_ns() // 1_000_000_000
+
+# ETags déjà calculés par (chemin, requête, version des données), bornés en LRU
+_ETAG_CACHE: "OrderedDict[tuple, str]" = OrderedDict()
+_ETAG_CACHE_SIZE = 1024
+
+def _etag_response(request: Request, data: Any, version: Optional[int] = None) -> Response:
+    """Réponse JSON avec ETag ; 304 sans corps si le client possède déjà cette version"""
+    if_none_match = request.headers.get("if-none-match")
+    key = (request.url.path, request.url.query, version) if version is not None else None
+    
+    # Version connue : 304 sans même sérialiser les données
+    if key is not None and if_none_match:
+        etag = _ETAG_CACHE.get(key)
+        if etag == if_none_match:
+            _ETAG_CACHE.move_to_end(key)
+            return Response(status_code=304, headers={"ETag": etag})
+    
+    body = orjson.dumps(data)
+    etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+    if key is not None:
+        _ETAG_CACHE[key] = etag
+        if len(_ETAG_CACHE) > _ETAG_CACHE_SIZE:
+            _ETAG_CACHE.popitem(last=False)
+    
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "max-age=5"}
+    )
+
 router = APIRouter(tags=["Sensors"])
 
 class SensorReading(BaseModel):
@@ -42,25 +81,26 @@ async def submit_sensor_data(
             )
         
         # Soumission via l'Oracle Manager
-        result = await oracle_manager.submit_sensor_data(reading.dict())
+        result = await oracle_manager.submit_sensor_data(reading)
         
         return SensorSubmissionResponse(
             success=True,
             transaction_hash=result.get("tx_hash"),
             message="Données soumises avec succès",
-            timestamp=int(datetime.now().timestamp())
+            timestamp=_now_s()
         )
         
     except Exception as e:
         return SensorSubmissionResponse(
             success=False,
             message=f"Erreur lors de la soumission: {str(e)}",
-            timestamp=int(datetime.now().timestamp())
+            timestamp=_now_s()
         )
 
 @router.get("/sensors/latest/{sensor_id}")
 async def get_latest_sensor_data(
     sensor_id: str,
+    request: Request,
     oracle_manager: OracleManager = Depends(get_oracle_manager)
 ):
     """Récupère les dernières données d'un capteur"""
@@ -73,7 +113,7 @@ async def get_latest_sensor_data(
                 detail=f"Aucune donnée trouvée pour le capteur {sensor_id}"
             )
         
-        return data
+        return _etag_response(request, data, version=data.get("timestamp"))
         
     except HTTPException:
         raise
@@ -86,10 +126,12 @@ async def get_latest_sensor_data(
 @router.get("/sensors/history/{sensor_id}")
 async def get_sensor_history(
     sensor_id: str,
+    request: Request,
     limit: int = 100,
+    columnar: bool = False,
     oracle_manager: OracleManager = Depends(get_oracle_manager)
 ):
-    """Récupère l'historique d'un capteur"""
+    """Récupère l'historique d'un capteur (columnar=true : une liste par champ)"""
     try:
         if limit > 1000:
             raise HTTPException(
@@ -97,13 +139,22 @@ async def get_sensor_history(
                 detail="Limite maximale: 1000 enregistrements"
             )
         
+        if columnar:
+            columns = await oracle_manager.get_sensor_history_columns(sensor_id, limit)
+            timestamps = columns["timestamps"]
+            return _etag_response(
+                request,
+                {"sensor_id": sensor_id, "count": len(timestamps), "data": columns},
+                version=timestamps[0] if timestamps else None
+            )
+        
         history = await oracle_manager.get_sensor_history(sensor_id, limit)
         
-        return {
-            "sensor_id": sensor_id,
-            "count": len(history),
-            "data": history
-        }
+        return _etag_response(
+            request,
+            {"sensor_id": sensor_id, "count": len(history), "data": history},
+            version=history[0].get("timestamp") if history else None
+        )
         
     except HTTPException:
         raise
@@ -1,28 +1,77 @@
 import asyncio
-import json
 import logging
+import random
 import time
-from typing import Dict, Any, Optional
-from src.blockchain.web3_client import Web3Client
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+
+import orjson
+
+from src.blockchain.web3_client import Web3Client, InsufficientGasError
 
 class AsyncContractHandler:
     """Gestionnaire de contrats intelligents avec support asynchrone"""
     
-    def __init__(self, web3_client: Web3Client):
+    # Modèle de gas de batchSubmitData : coût fixe de la transaction + coût par item
+    BATCH_BASE_GAS = 60000
+    BATCH_ITEM_GAS = 30000
+    # Taille max d'un lot pour rester sous la limite de gas du block
+    MAX_BATCH_SIZE = 200
+    
+    # TTL adaptatif : 2x l'intervalle moyen entre accès, borné
+    CACHE_TTL_MIN = 5.0
+    CACHE_TTL_MAX = 300.0
+    CACHE_EWMA_ALPHA = 0.3
+    CACHE_MAX_SIZE = 1024
+    
+    # Gas des fonctions mis en cache : pas d'estimate_gas avant chaque envoi
+    DEFAULT_GAS_LIMIT = 200000
+    GAS_CACHE_TTL = 300.0
+    # Nombre max de confirmations attendues simultanément
+    MAX_PENDING_CONFIRMATIONS = 256
+    
+    # Intervalle de re-vérification du prix du gas pour les soumissions différées
+    GAS_PRICE_RECHECK_INTERVAL = 15.0
+    
+    def __init__(self, web3_client: Web3Client, max_gas_price_gwei: Optional[float] = None,
+                 max_staleness: float = 300.0,
+                 on_deferred_submitted: Optional[Callable[[str, str], None]] = None):
         self.web3 = web3_client
         self.contracts = self.load_contracts()
         
         # Cache pour optimiser les appels
-        self.call_cache = {}
-        self.cache_ttl = 60  # 1 minute
+        self.call_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._rng = random.Random()
+        self.cache_ttl = 60  # TTL initial (1 minute) avant d'observer les accès
+        
+        # Gas par fonction de contrat : {function: (gas_limit, estimé_à)}
+        self._gas_cache: Dict[str, Tuple[int, float]] = {}
+        self._gas_refresh: Dict[str, asyncio.Task] = {}
+        
+        # Soumissions différées quand le gas dépasse le plafond : {sensor_id: (value, timestamp, différée_à)}
+        if max_gas_price_gwei is not None and max_gas_price_gwei <= 0:
+            raise ValueError("max_gas_price_gwei doit être strictement positif")
+        if max_staleness <= 0:
+            raise ValueError("max_submission_staleness doit être strictement positif")
+        self.max_gas_price_wei = int(max_gas_price_gwei * 1e9) if max_gas_price_gwei is not None else None
+        self.max_staleness = max_staleness
+        # Appelé (sensor_id, tx_hash) pour chaque soumission différée finalement envoyée
+        self.on_deferred_submitted = on_deferred_submitted
+        self._deferred: Dict[str, Tuple[float, int, float]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        
+        # Attentes de confirmation en arrière-plan (bornées par un sémaphore)
+        self._confirm_sem: Optional[asyncio.Semaphore] = None
+        self._pending_confirm: Set[asyncio.Task] = set()
         
         logging.info("📋 ContractHandler initialisé")
     
     def load_contracts(self) -> Dict[str, Any]:
         """Charge les ABIs et adresses des contrats"""
         try:
-            with open('config/contracts.json', 'r') as f:
-                contracts_config = json.load(f)
+            with open('config/contracts.json', 'rb') as f:
+                contracts_config = orjson.loads(f.read())
             
             logging.info(f"✅ {len(contracts_config)} contrats chargés")
             return contracts_config
@@ -55,9 +104,13 @@ class AsyncContractHandler:
             }
         }
     
-    async def submit_data_async(self, sensor_id: str, value: float, timestamp: int) -> str:
-        """Soumet les données au contrat de manière asynchrone"""
+    async def submit_data_async(self, sensor_id: str, value: float, timestamp: int) -> Optional[str]:
+        """Soumet les données au contrat (None si différée car le gas est trop cher)"""
         try:
+            if self.max_gas_price_wei is not None and await self.web3.get_gas_price() > self.max_gas_price_wei:
+                self._defer_submission(sensor_id, value, timestamp)
+                return None
+            
             # Préparation des données de transaction
             transaction_data = {
                 'function': 'submitData',
@@ -67,18 +120,22 @@ class AsyncContractHandler:
                     'value': int(value * 100),  # Precision fixe (2 décimales)
                     'timestamp': timestamp
                 },
-                'gas_limit': 200000
+                # Gas en cache (envoi optimiste, sans aller-retour d'estimation)
+                'gas_limit': self._cached_gas_limit('submitData')
             }
             
-            # Estimation du gas
-            estimated_gas = await self.web3.estimate_gas(transaction_data)
-            transaction_data['gas_limit'] = estimated_gas
-            
-            # Envoi de la transaction
-            tx_hash = await self.web3.send_transaction(transaction_data)
+            # Envoi via la file du Web3Client : les soumissions concurrentes
+            # partagent un même lot JSON-RPC
+            try:
+                tx_hash = await self.web3.send_transaction(transaction_data)
+            except InsufficientGasError:
+                # Ré-estimation seulement après un échec, puis un unique nouvel essai
+                transaction_data['gas_limit'] = await self._estimate_and_cache_gas(transaction_data)
+                tx_hash = await self.web3.send_transaction(transaction_data)
+            self.invalidate_sensor(sensor_id)
             
             # Attente de confirmation en arrière-plan
-            asyncio.create_task(self._wait_and_log_confirmation(tx_hash, sensor_id, value))
+            self._track_confirmation(tx_hash, sensor_id, value)
             
             return tx_hash
             
@@ -86,6 +143,116 @@ class AsyncContractHandler:
             logging.error(f"❌ Erreur soumission données {sensor_id}: {e}")
             raise
     
+    def _defer_submission(self, sensor_id: str, value: float, timestamp: int):
+        """Met une soumission en attente (seule la dernière valeur d'un capteur est gardée)"""
+        previous = self._deferred.get(sensor_id)
+        deferred_at = previous[2] if previous else time.monotonic()
+        self._deferred[sensor_id] = (value, timestamp, deferred_at)
+        
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_deferred())
+    
+    async def _flush_deferred(self):
+        """Soumet en lot les données différées quand le gas redescend ou qu'elles deviennent trop vieilles"""
+        while self._deferred:
+            await asyncio.sleep(self.GAS_PRICE_RECHECK_INTERVAL)
+            
+            try:
+                gas_ok = await self.web3.get_gas_price() <= self.max_gas_price_wei
+            except Exception as e:
+                logging.warning(f"⚠️ Prix du gas indisponible: {e}")
+                gas_ok = False
+            
+            now = time.monotonic()
+            due = [
+                sensor_id for sensor_id, (_, _, deferred_at) in self._deferred.items()
+                if gas_ok or now - deferred_at > self.max_staleness
+            ]
+            if not due:
+                continue
+            
+            pending = [(sensor_id, self._deferred.pop(sensor_id)) for sensor_id in due]
+            chunks = [
+                pending[i:i + self.MAX_BATCH_SIZE]
+                for i in range(0, len(pending), self.MAX_BATCH_SIZE)
+            ]
+            logging.info(f"📦 Soumission de {len(pending)} données différées")
+            # Résultat par lot : seuls les lots en échec sont remis en attente
+            results = await asyncio.gather(
+                *(self._submit_batch_chunk(self._deferred_items(chunk)) for chunk in chunks),
+                return_exceptions=True
+            )
+            
+            for chunk, result in zip(chunks, results):
+                if isinstance(result, Exception):
+                    logging.warning(f"⚠️ Échec soumission différée ({len(chunk)} données): {result}")
+                    # Remise en attente sauf si une valeur plus récente est arrivée entre-temps
+                    for sensor_id, entry in chunk:
+                        self._deferred.setdefault(sensor_id, entry)
+                    continue
+                
+                for (sensor_id, (value, _, _)), tx_hash in zip(chunk, result):
+                    self._track_confirmation(tx_hash, sensor_id, value)
+                    if self.on_deferred_submitted is not None:
+                        self.on_deferred_submitted(sensor_id, tx_hash)
+    
+    @staticmethod
+    def _deferred_items(chunk: List[Tuple[str, Tuple[float, int, float]]]) -> List[Dict[str, Any]]:
+        """Convertit des entrées différées au format de batch_submit_data"""
+        return [
+            {'sensor_id': sensor_id, 'value': value, 'timestamp': timestamp}
+            for sensor_id, (value, timestamp, _) in chunk
+        ]
+    
+    def _cached_gas_limit(self, function: str) -> int:
+        """Retourne le gas en cache d'une fonction (rafraîchi en arrière-plan si périmé)"""
+        entry = self._gas_cache.get(function)
+        if entry is None or time.monotonic() - entry[1] > self.GAS_CACHE_TTL:
+            refresh = self._gas_refresh.get(function)
+            if refresh is None or refresh.done():
+                refresh = asyncio.create_task(self._estimate_and_cache_gas({'function': function}))
+                refresh.add_done_callback(self._log_gas_refresh_failure)
+                self._gas_refresh[function] = refresh
+        return entry[0] if entry is not None else self.DEFAULT_GAS_LIMIT
+    
+    @staticmethod
+    def _log_gas_refresh_failure(task: asyncio.Task):
+        """Récupère l'erreur d'un rafraîchissement de gas en arrière-plan (valeur en cache conservée)"""
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning(f"⚠️ Ré-estimation du gas échouée: {task.exception()}")
+    
+    async def _estimate_and_cache_gas(self, transaction_data: Dict[str, Any]) -> int:
+        """Estime le gas d'une transaction et met à jour le cache de sa fonction"""
+        gas_limit = await self.web3.estimate_gas(transaction_data)
+        self._gas_cache[transaction_data['function']] = (gas_limit, time.monotonic())
+        return gas_limit
+    
+    def _track_confirmation(self, tx_hash: str, sensor_id: str, value: float):
+        """Lance l'attente de confirmation en arrière-plan (suivie pour l'arrêt)"""
+        task = asyncio.create_task(self._guarded_confirmation(tx_hash, sensor_id, value))
+        self._pending_confirm.add(task)
+        task.add_done_callback(self._pending_confirm.discard)
+    
+    async def _guarded_confirmation(self, tx_hash: str, sensor_id: str, value: float):
+        """Attend la confirmation en limitant le nombre d'attentes simultanées"""
+        if self._confirm_sem is None:
+            self._confirm_sem = asyncio.Semaphore(self.MAX_PENDING_CONFIRMATIONS)
+        async with self._confirm_sem:
+            await self._wait_and_log_confirmation(tx_hash, sensor_id, value)
+    
+    async def aclose(self):
+        """Arrête les tâches de fond (gas, différées) et attend la fin des confirmations en cours"""
+        for refresh in self._gas_refresh.values():
+            refresh.cancel()
+        self._gas_refresh.clear()
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+            if self._deferred:
+                logging.warning(f"⚠️ {len(self._deferred)} soumission(s) différée(s) abandonnée(s) à l'arrêt")
+        if self._pending_confirm:
+            await asyncio.gather(*self._pending_confirm, return_exceptions=True)
+    
     async def _wait_and_log_confirmation(self, tx_hash: str, sensor_id: str, value: float):
         """Attend la confirmation et log le résultat"""
         try:
@@ -109,27 +276,38 @@ class AsyncContractHandler:
             if cached_result:
                 return cached_result
             
-            # Simulation d'appel de lecture de contrat
-            await asyncio.sleep(0.1)
+            # Les appels concurrents pour la même clé partagent une seule lecture
+            inflight = self._inflight.get(cache_key)
+            if inflight is None:
+                inflight = asyncio.ensure_future(self._fetch_latest_data(cache_key, sensor_id))
+                self._inflight[cache_key] = inflight
+                inflight.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
             
-            # Données simulées
-            import random
-            simulated_data = {
-                'value': round(random.uniform(20, 30), 2),
-                'timestamp': int(time.time()) - random.randint(0, 300),
-                'block_number': await self.web3.get_latest_block(),
-                'sensor_id': sensor_id
-            }
-            
-            # Mise en cache
-            self._set_cache(cache_key, simulated_data)
-            
-            return simulated_data
+            # shield : l'annulation d'un appelant n'interrompt pas la lecture partagée
+            return await asyncio.shield(inflight)
             
         except Exception as e:
             logging.error(f"❌ Erreur lecture données {sensor_id}: {e}")
             return None
     
+    async def _fetch_latest_data(self, cache_key: str, sensor_id: str) -> Dict[str, Any]:
+        """Lit les dernières données d'un capteur sur le contrat et les met en cache"""
+        # Simulation d'appel de lecture de contrat
+        await asyncio.sleep(0.1)
+        
+        # Données simulées
+        simulated_data = {
+            'value': round(self._rng.uniform(20, 30), 2),
+            'timestamp': int(time.time()) - self._rng.randint(0, 300),
+            'block_number': await self.web3.get_latest_block(),
+            'sensor_id': sensor_id
+        }
+        
+        # Mise en cache
+        self._set_cache(cache_key, simulated_data)
+        
+        return simulated_data
+    
     async def batch_submit_data(self, data_batch: list) -> list:
         """Soumet plusieurs données en lot pour optimiser les coûts"""
         try:
@@ -138,27 +316,50 @@ class AsyncContractHandler:
             
             logging.info(f"📦 Soumission en lot de {len(data_batch)} données")
             
-            # Préparation de la transaction batch
-            batch_transaction = {
-                'function': 'batchSubmitData',
-                'contract': 'DataOracle',
-                'parameters': {
-                    'sensorIds': [item['sensor_id'] for item in data_batch],
-                    'values': [int(item['value'] * 100) for item in data_batch],
-                    'timestamps': [item['timestamp'] for item in data_batch]
-                },
-                'gas_limit': 50000 * len(data_batch)  # Gas par item
-            }
-            
-            tx_hash = await self.web3.send_transaction(batch_transaction)
+            # Découpage des lots trop gros, envoyés de concert dans la file du Web3Client
+            chunks = [
+                data_batch[i:i + self.MAX_BATCH_SIZE]
+                for i in range(0, len(data_batch), self.MAX_BATCH_SIZE)
+            ]
+            chunk_hashes = await asyncio.gather(*(self._submit_batch_chunk(chunk) for chunk in chunks))
             
             # Retour des hash pour chaque item
-            return [tx_hash] * len(data_batch)
+            return [tx_hash for hashes in chunk_hashes for tx_hash in hashes]
             
         except Exception as e:
             logging.error(f"❌ Erreur soumission batch: {e}")
             raise
     
+    async def _submit_batch_chunk(self, chunk: list) -> list:
+        """Envoie un lot de taille bornée en une seule transaction batchSubmitData"""
+        n = len(chunk)
+        sensor_ids = [None] * n
+        values = [None] * n
+        timestamps = [None] * n
+        
+        # Une seule passe sur le lot
+        for i, item in enumerate(chunk):
+            sensor_ids[i] = item['sensor_id']
+            values[i] = int(item['value'] * 100)
+            timestamps[i] = item['timestamp']
+        
+        batch_transaction = {
+            'function': 'batchSubmitData',
+            'contract': 'DataOracle',
+            'parameters': {
+                'sensorIds': sensor_ids,
+                'values': values,
+                'timestamps': timestamps
+            },
+            # Plafond calculé : pas d'aller-retour estimate_gas
+            'gas_limit': self.BATCH_BASE_GAS + self.BATCH_ITEM_GAS * n
+        }
+        
+        tx_hash = await self.web3.send_transaction(batch_transaction)
+        for sensor_id in sensor_ids:
+            self.invalidate_sensor(sensor_id)
+        return [tx_hash] * n
+    
     async def update_stake_async(self, amount: int) -> str:
         """Met à jour le stake du nœud"""
         try:
@@ -203,21 +404,55 @@ class AsyncContractHandler:
             raise
     
     def _get_from_cache(self, key: str) -> Optional[Any]:
-        """Récupère une valeur du cache"""
-        if key in self.call_cache:
-            cached_item = self.call_cache[key]
-            if time.time() - cached_item['timestamp'] < self.cache_ttl:
-                return cached_item['data']
-            else:
-                del self.call_cache[key]
+        """Récupère une valeur du cache et met à jour l'intervalle moyen d'accès"""
+        cached_item = self.call_cache.get(key)
+        if cached_item is None:
+            return None
+        
+        now = time.monotonic()
+        delta = now - cached_item['last_access']
+        cached_item['last_access'] = now
+        cached_item['access_ewma'] += self.CACHE_EWMA_ALPHA * (delta - cached_item['access_ewma'])
+        
+        self.call_cache.move_to_end(key)
+        
+        # Entrée expirée conservée pour garder l'historique d'accès de la clé
+        if now - cached_item['timestamp'] < cached_item['ttl']:
+            return cached_item['data']
         return None
     
     def _set_cache(self, key: str, data: Any):
-        """Met une valeur en cache"""
+        """Met une valeur en cache avec un TTL dérivé de la fréquence d'accès"""
+        now = time.monotonic()
+        previous = self.call_cache.get(key)
+        access_ewma = previous['access_ewma'] if previous else self.cache_ttl / 2
+        
         self.call_cache[key] = {
             'data': data,
-            'timestamp': time.time()
+            'timestamp': now,
+            'ttl': min(max(2 * access_ewma, self.CACHE_TTL_MIN), self.CACHE_TTL_MAX),
+            'last_access': now,
+            'access_ewma': access_ewma
         }
+        self.call_cache.move_to_end(key)
+        
+        # Éviction LRU au-delà de la taille max
+        while len(self.call_cache) > self.CACHE_MAX_SIZE:
+            self.call_cache.popitem(last=False)
+    
+    def delete(self, key: str):
+        """Supprime une entrée du cache"""
+        self.call_cache.pop(key, None)
+    
+    def clear(self):
+        """Vide le cache"""
+        self.call_cache.clear()
+    
+    def invalidate_sensor(self, sensor_id: str):
+        """Invalide les données en cache d'un capteur après une soumission"""
+        cached_item = self.call_cache.get(f"latest_data_{sensor_id}")
+        if cached_item is not None:
+            cached_item['ttl'] = 0.0
     
     def get_contract_stats(self) -> Dict[str, Any]:
         """Retourne les statistiques des contrats"""
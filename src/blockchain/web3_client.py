@@ -1,33 +1,106 @@
 import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, Optional
-import json
+import random
+import secrets
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+try:
+    import aiohttp
+except ImportError:  # Transport HTTP réel indisponible - lectures simulées uniquement
+    aiohttp = None
+
+class RPCError(Exception):
+    """Erreur renvoyée par le nœud JSON-RPC"""
+
+class InsufficientGasError(RPCError):
+    """Transaction rejetée faute de gas (limite trop basse)"""
+
+# Messages des nœuds signalant une limite de gas insuffisante
+_GAS_ERROR_MARKERS = ('insufficient gas', 'out of gas', 'intrinsic gas too low')
 
 class Web3Client:
     """Client Web3 pour interaction avec la blockchain"""
     
+    __slots__ = (
+        'rpc_url', 'private_key', 'contract_address', 'simulate_real_hash', '_account_address',
+        'connected', 'latest_block', '_rng', '_np_rng', 'transaction_count', 'failed_transactions',
+        'batch_size', 'batch_delay', '_pending', '_pump_task', '_inflight_batch', 'rpc_transport', '_session', '_rpc_id'
+    )
+    
+    JSON_HEADERS = {'Content-Type': 'application/json'}
+    
+    # Gas estimé par fonction de contrat (construit une fois pour la classe)
+    _GAS_ESTIMATES = {
+        'submitData': 150000,
+        'updateStake': 100000,
+        'slashStake': 200000
+    }
+    _DEFAULT_GAS_ESTIMATE = 100000
+    
     def __init__(self, network_config: Dict[str, Any]):
         self.rpc_url = network_config['blockchain_rpc']
         self.private_key = network_config.get('private_key')
         self.contract_address = network_config['contract_address']
         
+        # Hash réel (sha256 du contenu) ou aléatoire pour les tx simulées
+        self.simulate_real_hash = bool(network_config.get('simulate_real_hash', False))
+        
+        # Adresse dérivée une seule fois de la clé privée (simulation)
+        if self.private_key:
+            self._account_address = "0x" + hashlib.sha256(self.private_key.encode()).hexdigest()[:40]
+        else:
+            self._account_address = "0x0000000000000000000000000000000000000000"
+        
         # Simulation d'une connexion Web3
         self.connected = False
         self.latest_block = 0
         
+        # Générateurs propres au client (pas de verrou du module random global)
+        self._rng = random.Random()
+        self._np_rng = np.random.default_rng()
+        
         # Métriques
         self.transaction_count = 0
         self.failed_transactions = 0
         
+        # Coalescence des transactions en lots JSON-RPC
+        self.batch_size = int(network_config.get('rpc_batch_size', 32))
+        self.batch_delay = network_config.get('rpc_batch_delay_ms', 5) / 1000
+        self._pending: Optional[asyncio.Queue] = None
+        self._pump_task: Optional[asyncio.Task] = None
+        self._inflight_batch: List[Tuple[Dict, asyncio.Future]] = []  # Lot en cours d'envoi
+        
+        # Lectures JSON-RPC sans signature (eth_blockNumber, eth_gasPrice) : "simulated" (défaut)
+        # ou "http" via une session aiohttp persistante. Les transactions restent simulées
+        # tant qu'elles ne sont pas signées.
+        self.rpc_transport = network_config.get('rpc_transport', 'simulated')
+        if self.rpc_transport == 'http' and aiohttp is None:
+            logging.warning("⚠️ aiohttp non installé - lectures JSON-RPC simulées")
+            self.rpc_transport = 'simulated'
+        self._session = None
+        self._rpc_id = 0
+        
         logging.info(f"🔗 Web3Client initialisé pour {self.rpc_url}")
     
     async def connect(self) -> bool:
         """Établit la connexion à la blockchain"""
         try:
-            # Simulation de connexion
-            await asyncio.sleep(0.1)
+            if self.rpc_transport == 'http':
+                # Session unique réutilisée (keep-alive) : pas de handshake TCP/TLS par appel
+                if self._session is None or self._session.closed:
+                    self._session = aiohttp.ClientSession(
+                        connector=aiohttp.TCPConnector(limit_per_host=100, ttl_dns_cache=300)
+                    )
+                self.latest_block = int(await self._rpc_call('eth_blockNumber'), 16)
+            else:
+                # Simulation de connexion
+                await asyncio.sleep(0.1)
+                self.latest_block = 18500000  # Block number simulé
             self.connected = True
-            self.latest_block = 18500000  # Block number simulé
             
             logging.info("✅ Connexion blockchain établie")
             return True
@@ -37,68 +110,185 @@ class Web3Client:
             self.connected = False
             return False
     
+    async def aclose(self):
+        """Arrête la file de lots (envois en attente en échec) et ferme la session HTTP"""
+        if self._pump_task is not None:
+            self._pump_task.cancel()
+            try:
+                await self._pump_task
+            except asyncio.CancelledError:
+                pass
+            self._pump_task = None
+        
+        # Aucun appelant ne doit rester bloqué sur un envoi qui ne partira plus
+        abandoned = [future for _, future in self._inflight_batch]
+        self._inflight_batch = []
+        while self._pending is not None and not self._pending.empty():
+            abandoned.append(self._pending.get_nowait()[1])
+        for future in abandoned:
+            if not future.done():
+                future.set_exception(ConnectionError("Web3Client fermé avant l'envoi de la transaction"))
+        
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self.connected = False
+    
+    async def disconnect(self):
+        """Ferme la connexion à la blockchain"""
+        await self.aclose()
+    
     async def get_latest_block(self) -> int:
         """Récupère le numéro du dernier block"""
         if not self.connected:
             await self.connect()
         
+        if self.rpc_transport == 'http':
+            self.latest_block = int(await self._rpc_call('eth_blockNumber'), 16)
+            return self.latest_block
+        
         # Simulation d'incrémentation des blocks
         self.latest_block += 1
         return self.latest_block
     
     async def get_gas_price(self) -> int:
         """Récupère le prix du gas actuel"""
+        if self.rpc_transport == 'http':
+            if not self.connected:
+                await self.connect()
+            return int(await self._rpc_call('eth_gasPrice'), 16)
+        
         # Simulation de prix du gas variable
-        import random
         base_price = 20  # Gwei
-        variation = random.uniform(0.8, 1.5)
+        variation = self._rng.uniform(0.8, 1.5)
         return int(base_price * variation * 1e9)  # Conversion en wei
     
+    async def _rpc_call(self, method: str, params: Optional[List[Any]] = None) -> Any:
+        """Appel JSON-RPC unitaire sur la session persistante"""
+        self._rpc_id += 1
+        payload = {"jsonrpc": "2.0", "id": self._rpc_id, "method": method, "params": params or []}
+        async with self._session.post(self.rpc_url, data=orjson.dumps(payload), headers=self.JSON_HEADERS) as response:
+            response.raise_for_status()
+            body = orjson.loads(await response.read())
+        if 'error' in body:
+            raise RPCError(f"{method}: {body['error'].get('message')}")
+        return body['result']
+    
     async def estimate_gas(self, transaction_data: Dict) -> int:
         """Estime le gas nécessaire pour une transaction"""
-        # Estimation basée sur le type d'opération
-        operation = transaction_data.get('function', 'unknown')
-        
-        gas_estimates = {
-            'submitData': 150000,
-            'updateStake': 100000,
-            'slashStake': 200000,
-            'unknown': 100000
-        }
-        
-        return gas_estimates.get(operation, 100000)
+        # Estimation basée sur le type d'opération (eth_estimateGas exigerait le calldata encodé)
+        return self._GAS_ESTIMATES.get(transaction_data.get('function'), self._DEFAULT_GAS_ESTIMATE)
     
     async def send_transaction(self, transaction_data: Dict) -> str:
-        """Envoie une transaction à la blockchain"""
-        try:
-            if not self.connected:
-                await self.connect()
-            
-            # Simulation d'envoi de transaction
-            await asyncio.sleep(0.2)  # Latence réseau
-            
-            # Génération d'un hash de transaction simulé
-            import hashlib
-            import time
-            
-            tx_data = f"{transaction_data}_{time.time()}_{self.transaction_count}"
-            tx_hash = "0x" + hashlib.sha256(tx_data.encode()).hexdigest()
+        """Envoie une transaction à la blockchain (regroupée avec les envois concurrents)"""
+        return await self._enqueue(transaction_data)
+    
+    async def _enqueue(self, transaction_data: Dict) -> str:
+        """Place une transaction dans la file du prochain lot et attend son hash"""
+        if self._pending is None:
+            self._pending = asyncio.Queue()
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._batch_pump())
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending.put_nowait((transaction_data, future))
+        return await future
+    
+    async def _batch_pump(self):
+        """Draine la file par lots de batch_size ou après batch_delay"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._pending.get()]
+            self._inflight_batch = batch
+            deadline = loop.time() + self.batch_delay
             
-            self.transaction_count += 1
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._pending.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
             
-            # Simulation d'échec occasionnel
-            import random
-            if random.random() < 0.05:  # 5% d'échec
-                self.failed_transactions += 1
-                raise Exception("Transaction failed: insufficient gas")
+            try:
+                results = await self.send_transactions_batch([tx for tx, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
             
-            logging.info(f"📤 Transaction envoyée: {tx_hash[:10]}...")
-            return tx_hash
+            for (_, future), result in zip(batch, results):
+                if future.done():  # Appelant annulé entre-temps
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            self._inflight_batch = []
+    
+    async def send_transactions_batch(self, transactions: List[Dict]) -> List[Any]:
+        """Envoie plusieurs transactions en un seul appel JSON-RPC (hash ou exception par transaction)"""
+        try:
+            if not self.connected:
+                await self.connect()
             
+            requests = [
+                {"jsonrpc": "2.0", "id": i, "method": "eth_sendRawTransaction", "params": [tx]}
+                for i, tx in enumerate(transactions)
+            ]
+            responses = await self._post_batch(requests)
+            self.transaction_count += len(requests)
         except Exception as e:
-            self.failed_transactions += 1
-            logging.error(f"❌ Erreur envoi transaction: {e}")
+            self.failed_transactions += len(transactions)
+            logging.error(f"❌ Erreur envoi lot de transactions: {e}")
             raise
+        
+        # Les réponses JSON-RPC d'un lot peuvent arriver dans le désordre
+        by_id = {response['id']: response for response in responses}
+        results = []
+        for request in requests:
+            response = by_id.get(request['id'])
+            if response is None or 'error' in response:
+                self.failed_transactions += 1
+                message = response['error']['message'] if response else "no response"
+                logging.error(f"❌ Erreur envoi transaction: {message}")
+                error_type = InsufficientGasError if any(m in message for m in _GAS_ERROR_MARKERS) else RPCError
+                results.append(error_type(f"Transaction failed: {message}"))
+            else:
+                results.append(response['result'])
+        
+        logging.info(f"📤 Lot de {len(requests)} transaction(s) envoyé en un aller-retour")
+        return results
+    
+    async def _post_batch(self, requests: List[Dict]) -> List[Dict]:
+        """Poste un tableau JSON-RPC au nœud et retourne le tableau de réponses"""
+        # Pas de transport réel tant que les transactions ne sont pas signées :
+        # eth_sendRawTransaction attend une transaction signée encodée en hex
+        
+        # Simulation d'un unique aller-retour HTTP pour tout le lot
+        await asyncio.sleep(0.2)  # Latence réseau
+        
+        responses = []
+        # Simulation d'échec occasionnel (5%), tirée en une fois pour le lot
+        failures = self._np_rng.random(len(requests)) < 0.05
+        for i, (request, failed) in enumerate(zip(requests, failures.tolist())):
+            if self.simulate_real_hash:
+                # Hash déterministe du compte et du compteur (pas de repr du payload)
+                counter = (self.transaction_count + i).to_bytes(8, 'big')
+                tx_hash = "0x" + hashlib.sha256(self._account_address.encode() + counter).hexdigest()
+            else:
+                tx_hash = "0x" + secrets.token_hex(32)
+            
+            if failed:
+                responses.append({
+                    "jsonrpc": "2.0", "id": request['id'],
+                    "error": {"code": -32000, "message": "insufficient gas"}
+                })
+            else:
+                responses.append({
+                    "jsonrpc": "2.0", "id": request['id'],
+                    "result": tx_hash
+                })
+        return responses
     
     async def wait_for_confirmation(self, tx_hash: str, confirmations: int = 1) -> bool:
         """Attend la confirmation d'une transaction"""
@@ -107,8 +297,7 @@ class Web3Client:
             await asyncio.sleep(2.0)  # Temps de block simulé
             
             # Simulation de confirmation réussie (95% de succès)
-            import random
-            success = random.random() > 0.05
+            success = self._rng.random() > 0.05
             
             if success:
                 logging.info(f"✅ Transaction confirmée: {tx_hash[:10]}...")
@@ -123,12 +312,7 @@ class Web3Client:
     
     def get_account_address(self) -> str:
         """Retourne l'adresse du compte"""
-        if self.private_key:
-            # Simulation d'adresse basée sur la clé privée
-            import hashlib
-            address_hash = hashlib.sha256(self.private_key.encode()).hexdigest()
-            return f"0x{address_hash[:40]}"
-        return "0x0000000000000000000000000000000000000000"
+        return self._account_address
     
     async def get_balance(self, address: Optional[str] = None) -> int:
         """Récupère le solde d'une adresse"""
@@ -136,8 +320,7 @@ class Web3Client:
             address = self.get_account_address()
         
         # Simulation de solde
-        import random
-        balance_eth = random.uniform(0.1, 10.0)
+        balance_eth = self._rng.uniform(0.1, 10.0)
         return int(balance_eth * 1e18)  # Conversion en wei
     
     def get_stats(self) -> Dict[str, Any]:
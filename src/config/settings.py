@@ -4,7 +4,9 @@ Gestion centralisée des variables d'environnement
 """
 
 import os
+import re
 import logging
+from dataclasses import make_dataclass
 from typing import Optional
 from pydantic import BaseSettings, validator
 from dotenv import load_dotenv
@@ -12,6 +14,10 @@ from dotenv import load_dotenv
 # Chargement des variables d'environnement
 load_dotenv()
 
+# Formats attendus (regex précompilées, sans conversion en entier)
+_PK_RE = re.compile(r'(?:0x)?[0-9a-fA-F]{64}')
+_ADDR_RE = re.compile(r'0x[0-9a-fA-F]{40}')
+
 class Settings(BaseSettings):
     """Configuration principale de l'application RODIO"""
     
@@ -51,21 +57,12 @@ class Settings(BaseSettings):
         if not v:
             raise ValueError("PRIVATE_KEY est requis")
         
-        # Supprime le préfixe 0x si présent
-        if v.startswith('0x'):
-            v = v[2:]
-        
-        # Vérifie la longueur (64 caractères hex)
-        if len(v) != 64:
+        # 64 caractères hexadécimaux, préfixe 0x optionnel
+        if not _PK_RE.fullmatch(v):
             raise ValueError("PRIVATE_KEY doit faire 64 caractères hexadécimaux")
         
-        # Vérifie que c'est bien de l'hexadécimal
-        try:
-            int(v, 16)
-        except ValueError:
-            raise ValueError("PRIVATE_KEY doit être en format hexadécimal")
-        
-        return v
+        # Supprime le préfixe 0x si présent
+        return v[2:] if v.startswith('0x') else v
     
     @validator('contract_address')
     def validate_contract_address(cls, v):
@@ -73,11 +70,8 @@ class Settings(BaseSettings):
         if not v:
             raise ValueError("CONTRACT_ADDRESS est requis")
         
-        if not v.startswith('0x'):
-            raise ValueError("CONTRACT_ADDRESS doit commencer par 0x")
-        
-        if len(v) != 42:
-            raise ValueError("CONTRACT_ADDRESS doit faire 42 caractères")
+        if not _ADDR_RE.fullmatch(v):
+            raise ValueError("CONTRACT_ADDRESS doit être 0x suivi de 40 caractères hexadécimaux")
         
         return v.lower()
     
@@ -93,8 +87,16 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = False
 
-# Instance globale des settings
-settings = Settings()
+# Miroir immuable des champs de Settings : dataclass figée (lecture d'attribut
+# directe, sans passer par le modèle pydantic)
+FrozenSettings = make_dataclass(
+    'FrozenSettings',
+    list(Settings.__annotations__.items()),
+    frozen=True
+)
+
+# Validation pydantic une seule fois au démarrage, puis copie figée
+settings = FrozenSettings(**Settings().dict())
 
 def setup_logging():
     """Configure le logging de l'application"""
@@ -107,6 +109,6 @@ def setup_logging():
         ]
     )
 
-def get_settings() -> Settings:
-    """Retourne l'instance des settings"""
+def get_settings() -> FrozenSettings:
+    """Retourne les settings validés (copie figée au démarrage)"""
     return settings
\ No newline at end of file
@@ -1,8 +1,13 @@
-import statistics
+import logging
+import math
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Union
 from dataclasses import dataclass
 
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
 @dataclass
 class SensorReading:
     """Représente une lecture de capteur avec métadonnées"""
@@ -11,6 +16,56 @@ class SensorReading:
     node_id: str
     signature: str  # Preuve cryptographique
 
+@dataclass
+class SensorReadingBatch:
+    """Lot de lectures stocké en colonnes (un tableau NumPy par champ)"""
+    values: np.ndarray
+    timestamps: np.ndarray
+    node_ids: np.ndarray
+    signatures: np.ndarray
+    sig_lens: np.ndarray
+    
+    @classmethod
+    def from_readings(cls, readings: List[SensorReading]) -> "SensorReadingBatch":
+        """Construit le lot en une seule passe sur les lectures"""
+        n = len(readings)
+        values = np.empty(n, dtype=np.float64)
+        timestamps = np.empty(n, dtype=np.int64)
+        node_ids = np.empty(n, dtype=object)
+        signatures = np.empty(n, dtype=object)
+        sig_lens = np.empty(n, dtype=np.int64)
+        
+        for i, r in enumerate(readings):
+            values[i] = r.value
+            timestamps[i] = r.timestamp
+            node_ids[i] = r.node_id
+            signatures[i] = r.signature
+            sig_lens[i] = len(r.signature)
+        
+        return cls(values, timestamps, node_ids, signatures, sig_lens)
+    
+    def select(self, mask: np.ndarray) -> "SensorReadingBatch":
+        """Retourne le sous-lot correspondant au masque booléen"""
+        return SensorReadingBatch(
+            self.values[mask], self.timestamps[mask], self.node_ids[mask],
+            self.signatures[mask], self.sig_lens[mask]
+        )
+    
+    def __len__(self) -> int:
+        return self.values.size
+    
+    def __iter__(self) -> Iterator[SensorReading]:
+        for value, timestamp, node_id, signature in zip(
+            self.values.tolist(), self.timestamps.tolist(), self.node_ids, self.signatures
+        ):
+            yield SensorReading(value, timestamp, node_id, signature)
+
+def _as_batch(readings: Union[List[SensorReading], SensorReadingBatch]) -> SensorReadingBatch:
+    """Convertit une liste de lectures en lot (sans copie si c'est déjà un lot)"""
+    if isinstance(readings, SensorReadingBatch):
+        return readings
+    return SensorReadingBatch.from_readings(readings)
+
 class ConsensusError(Exception):
     """Exception levée quand le consensus n'est pas atteint"""
     pass
@@ -22,8 +77,9 @@ class DataAggregator:
         self.consensus_threshold = consensus_config.get('consensus_threshold', 0.8)
         self.outlier_tolerance = consensus_config.get('outlier_tolerance', 0.05)
         self.min_nodes = consensus_config.get('min_nodes', 3)
+        self._quorum_cache: Dict[int, int] = {}
     
-    async def aggregate_readings(self, readings: List[SensorReading]) -> Dict[str, Any]:
+    async def aggregate_readings(self, readings: Union[List[SensorReading], SensorReadingBatch]) -> Dict[str, Any]:
         """Agrège les données de multiples nœuds avec consensus"""
         if len(readings) < self.min_nodes:
             raise ValueError(f"Minimum {self.min_nodes} nœuds requis pour l'agrégation")
@@ -32,84 +88,88 @@ class DataAggregator:
         validated_readings = self.validate_signatures(readings)
         
         # 2. Filtrage des outliers statistiques
-        values = [r.value for r in validated_readings]
+        values = validated_readings.values
         filtered_values = self.remove_outliers(values)
         
         if len(filtered_values) < self.min_nodes:
             raise ConsensusError("Trop d'outliers détectés - consensus impossible")
         
+        # Médiane calculée une seule fois : seuil de consensus et valeur finale
+        final_value = float(np.median(filtered_values))
+        
         # 3. Vérification du consensus
-        if not self.check_consensus(filtered_values):
+        if not self.check_consensus(filtered_values, median=final_value):
             raise ConsensusError("Pas de consensus atteint entre les nœuds")
         
-        # 4. Calcul de la valeur finale (médiane pour robustesse)
-        final_value = statistics.median(filtered_values)
+        # 4. Valeur finale = médiane (robustesse)
         confidence = self.calculate_confidence(filtered_values)
         
         return {
             "value": final_value,
-            "timestamp": max(r.timestamp for r in validated_readings),
+            "timestamp": int(validated_readings.timestamps.max()),
             "confidence": confidence,
             "nodes_participated": len(validated_readings),
             "outliers_removed": len(values) - len(filtered_values),
             "consensus_method": "median_with_iqr_filtering"
         }
     
-    def validate_signatures(self, readings: List[SensorReading]) -> List[SensorReading]:
+    def validate_signatures(self, readings: Union[List[SensorReading], SensorReadingBatch]) -> SensorReadingBatch:
         """Valide les signatures cryptographiques des lectures"""
-        validated = []
+        readings = _as_batch(readings)
         
-        for reading in readings:
-            # Validation simplifiée - en production utiliser ECDSA
-            if len(reading.signature) == 64:  # SHA256 hex length
-                validated.append(reading)
-            else:
-                print(f"⚠️ Signature invalide pour nœud {reading.node_id}")
+        # Validation simplifiée - en production utiliser ECDSA
+        mask = readings.sig_lens == 64  # SHA256 hex length
+        
+        invalid = int(np.count_nonzero(~mask))
+        if invalid:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("⚠️ %d signature(s) invalide(s) : %s", invalid, readings.node_ids[~mask].tolist())
+            return readings.select(mask)
         
-        return validated
+        return readings
     
-    def remove_outliers(self, values: List[float]) -> List[float]:
+    def remove_outliers(self, values: Sequence[float]) -> Sequence[float]:
         """Filtre les outliers avec la méthode IQR (Interquartile Range)"""
         if len(values) < 4:
             return values  # Pas assez de données pour filtrer
         
         try:
-            # Calcul des quartiles
-            sorted_values = sorted(values)
-            n = len(sorted_values)
+            arr = np.asarray(values, dtype=np.float64)
+            n = arr.size
             
+            # Calcul des quartiles (mêmes rangs n//4 et 3n//4, sélection sans tri complet)
             q1_idx = n // 4
             q3_idx = 3 * n // 4
-            
-            q1 = sorted_values[q1_idx]
-            q3 = sorted_values[q3_idx]
+            q1, q3 = np.partition(arr, (q1_idx, q3_idx))[[q1_idx, q3_idx]]
             
             iqr = q3 - q1
             lower_bound = q1 - 1.5 * iqr
             upper_bound = q3 + 1.5 * iqr
             
             # Filtrage des outliers
-            filtered = [v for v in values if lower_bound <= v <= upper_bound]
+            filtered = arr[(arr >= lower_bound) & (arr <= upper_bound)]
             
-            if len(filtered) < len(values):
-                print(f"🔍 {len(values) - len(filtered)} outliers supprimés (bounds: {lower_bound:.2f} - {upper_bound:.2f})")
+            if filtered.size < n and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🔍 %d outliers supprimés (bounds: %.2f - %.2f)", n - filtered.size, lower_bound, upper_bound)
             
-            return filtered if filtered else values  # Fallback si tous sont outliers
+            return filtered if filtered.size else values  # Fallback si tous sont outliers
             
         except Exception as e:
-            print(f"⚠️ Erreur filtrage outliers: {e}")
+            logger.warning("⚠️ Erreur filtrage outliers: %s", e)
             return values  # Fallback en cas d'erreur
     
-    def check_consensus(self, values: List[float]) -> bool:
-        """Vérifie si les valeurs sont dans la tolérance de consensus"""
-        if not values:
+    def check_consensus(self, values: Sequence[float], median: Optional[float] = None) -> bool:
+        """Vérifie si les valeurs sont dans la tolérance de consensus (médiane fournie ou calculée)"""
+        if len(values) == 0:
             return False
         
         if len(values) == 1:
             return True
         
         try:
-            median = statistics.median(values)
+            arr = np.asarray(values, dtype=np.float64)
+            if median is None:
+                median = np.median(arr)
             
             # Tolérance basée sur la valeur médiane
             if median == 0:
@@ -118,63 +178,67 @@ class DataAggregator:
                 threshold = abs(median * self.outlier_tolerance)
             
             # Compte les valeurs dans la tolérance
-            within_threshold = [
-                v for v in values 
-                if abs(v - median) <= threshold
-            ]
-            
-            consensus_ratio = len(within_threshold) / len(values)
+            within_threshold = int(np.count_nonzero(np.abs(arr - median) <= threshold))
             
-            print(f"📊 Consensus check: {len(within_threshold)}/{len(values)} nœuds d'accord ({consensus_ratio:.1%})")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("📊 Consensus check: %d/%d nœuds d'accord (%.1f%%)",
+                             within_threshold, arr.size, within_threshold / arr.size * 100)
             
-            return consensus_ratio >= self.consensus_threshold
+            return within_threshold >= self._consensus_quorum(arr.size)
             
         except Exception as e:
-            print(f"⚠️ Erreur vérification consensus: {e}")
+            logger.warning("⚠️ Erreur vérification consensus: %s", e)
             return False
     
-    def calculate_confidence(self, values: List[float]) -> float:
+    def _consensus_quorum(self, n: int) -> int:
+        """Nombre minimal de nœuds d'accord parmi n (arrondi supérieur de n * seuil)"""
+        quorum = self._quorum_cache.get(n)
+        if quorum is None:
+            # round() absorbe l'erreur flottante (ex: 0.7 * 10 = 7.000000000000001)
+            quorum = self._quorum_cache[n] = math.ceil(round(n * self.consensus_threshold, 9))
+        return quorum
+    
+    def calculate_confidence(self, values: Sequence[float]) -> float:
         """Calcule le niveau de confiance basé sur la variance"""
         if len(values) <= 1:
             return 1.0
         
         try:
-            # Calcul de la variance normalisée
-            mean_val = statistics.mean(values)
-            variance = statistics.variance(values)
+            # Calcul de la variance normalisée (variance d'échantillon, ddof=1)
+            arr = np.asarray(values, dtype=np.float64)
+            mean_val = arr.mean()
             
             if mean_val == 0:
                 cv = 0  # Coefficient de variation
             else:
-                cv = (variance ** 0.5) / abs(mean_val)  # Coefficient de variation
+                cv = arr.std(ddof=1) / abs(mean_val)  # Coefficient de variation
             
             # Conversion en score de confiance (0-1)
             # Plus la variance est faible, plus la confiance est élevée
-            confidence = max(0.0, min(1.0, 1.0 - cv))
+            confidence = max(0.0, min(1.0, 1.0 - float(cv)))
             
             return confidence
             
         except Exception as e:
-            print(f"⚠️ Erreur calcul confiance: {e}")
+            logger.warning("⚠️ Erreur calcul confiance: %s", e)
             return 0.5  # Confiance moyenne par défaut
     
-    def detect_malicious_nodes(self, readings: List[SensorReading]) -> List[str]:
-        """Détecte les nœuds potentiellement malveillants"""
+    def detect_malicious_nodes(self, readings: Union[List[SensorReading], SensorReadingBatch],
+                               median: Optional[float] = None) -> List[str]:
+        """Détecte les nœuds potentiellement malveillants (médiane des lectures fournie ou calculée)"""
         if len(readings) < 3:
             return []
         
-        values = [r.value for r in readings]
-        median = statistics.median(values)
+        batch = _as_batch(readings)
+        if median is None:
+            median = np.median(batch.values)
         
         # Seuil pour détecter les valeurs suspectes (plus strict que outliers)
         threshold = abs(median * 0.1)  # 10% de tolérance
         
-        malicious_nodes = []
-        for reading in readings:
-            if abs(reading.value - median) > threshold:
-                malicious_nodes.append(reading.node_id)
+        malicious_nodes = batch.node_ids[np.abs(batch.values - median) > threshold].tolist()
         
         if malicious_nodes:
-            print(f"🚨 Nœuds suspects détectés: {malicious_nodes}")
+            logger.warning("🚨 Nœuds suspects détectés: %s", malicious_nodes)
         
-        return malicious_nodes
\ No newline at end of file
+        return malicious_nodes
@@ -2,8 +2,18 @@ import asyncio
 import json
 import logging
 import time
-from typing import List, Dict, Any
-from src.core.aggregator import DataAggregator, SensorReading
+from typing import List, Dict, Any, Tuple
+
+import blake3
+import numpy as np
+import orjson
+
+try:
+    import aiohttp
+except ImportError:  # Transport HTTP vers les pairs indisponible - simulation uniquement
+    aiohttp = None
+
+from src.core.aggregator import DataAggregator, SensorReading, SensorReadingBatch
 from src.blockchain.web3_client import Web3Client
 from src.blockchain.contract_handler import AsyncContractHandler
 from src.security.staking import StakingManager
@@ -11,6 +21,16 @@ from src.adapters.temperature_adapter import TemperatureAdapter
 from src.adapters.humidity_adapter import HumidityAdapter
 from src.adapters.gps_adapter import GPSAdapter
 
+_SIGN_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def _sign_canonical(node_id: str, canonical: bytes) -> str:
+    """Hash signé d'une charge utile canonique"""
+    # BLAKE3 obligatoire : tous les nœuds doivent produire la même signature
+    hasher = blake3.blake3(node_id.encode())
+    hasher.update(b":")
+    hasher.update(canonical)
+    return hasher.hexdigest()  # 32 octets -> 64 caractères hex
+
 class RodioNode:
     """Nœud RODIO principal avec architecture Chainlink-style"""
     
@@ -21,11 +41,25 @@ class RodioNode:
         # Initialisation des composants
         self.web3_client = Web3Client(self.config['network'])
         self.aggregator = DataAggregator(self.config['consensus'])
+        
+        # Pré-filtre médiane ± c·λ·σ robuste (MAD) des lectures pairs, λ adaptatif par capteur :
+        # {capteur: (λ, MAD précédente)}
+        self.sigma_c = float(self.config['consensus'].get('sigma', 3.5))  # Seuil usuel du z-score modifié
+        self._lambda: Dict[str, Tuple[float, float]] = {}
         self.staking_manager = StakingManager(self.web3_client, self.config['staking'])
-        self.contract_handler = AsyncContractHandler(self.web3_client)
+        self.contract_handler = AsyncContractHandler(
+            self.web3_client,
+            max_gas_price_gwei=self.config['network'].get('max_gas_price_gwei'),
+            max_staleness=self.config['network'].get('max_submission_staleness', 300.0),
+            on_deferred_submitted=self._on_deferred_submitted
+        )
         
         # Registre des nœuds pairs pour l'agrégation
         self.peer_nodes = self.config.get('peer_nodes', [])
+        # Transport vers les pairs : "simulated" (défaut) ou "http" (session aiohttp partagée)
+        self.peer_transport = self.config.get('peer_transport', 'simulated')
+        self.peer_timeout = float(self.config.get('peer_timeout', 2.0))
+        self._session = None
         
         # Adapters de capteurs
         self.sensor_adapters = self.initialize_adapters()
@@ -35,7 +69,7 @@ class RodioNode:
             'readings_count': 0,
             'successful_submissions': 0,
             'consensus_failures': 0,
-            'uptime_start': time.time()
+            'uptime_start': time.monotonic()
         }
         
     def load_config(self, config_path: str) -> Dict:
@@ -53,8 +87,22 @@ class RodioNode:
     def initialize_adapters(self) -> Dict:
         """Initialise les adapters de capteurs"""
         adapters = {}
+        sensors_config = self.config['sensors']
         
-        for sensor_name, sensor_config in self.config['sensors'].items():
+        # Broker MQTT partagé (sensors.mqtt), transmis aux adapters s'il est activé
+        mqtt_config = sensors_config.get('mqtt', {})
+        shared_mqtt = {}
+        if mqtt_config.get('enabled'):
+            shared_mqtt = {
+                'mqtt_broker': mqtt_config.get('broker'),
+                'mqtt_port': mqtt_config.get('port', 1883),
+                'mqtt_username': mqtt_config.get('username'),
+                'mqtt_password': mqtt_config.get('password')
+            }
+        
+        for sensor_name, sensor_config in sensors_config.get('adapters', {}).items():
+            # Les réglages propres à l'adapter priment sur le broker partagé
+            sensor_config = {**shared_mqtt, **sensor_config}
             adapter_class = sensor_config['adapter']
             
             if adapter_class == 'TemperatureAdapter':
@@ -79,6 +127,13 @@ class RodioNode:
         
         logging.info("✅ Stake vérifié - Nœud autorisé à opérer")
         
+        # Session HTTP unique vers les pairs : connexions réutilisées d'un cycle à l'autre
+        if self.peer_transport == 'http' and aiohttp is not None:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.peer_timeout),
+                connector=aiohttp.TCPConnector(limit=64, keepalive_timeout=30)
+            )
+        
         # Démarrage des services
         tasks = [
             self.start_sensor_polling(),
@@ -86,7 +141,17 @@ class RodioNode:
             self.monitor_network_health()
         ]
         
-        await asyncio.gather(*tasks)
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            if self._session is not None:
+                await self._session.close()
+                self._session = None
+            for adapter in self.sensor_adapters.values():
+                await adapter.aclose()
+            # Confirmations en cours attendues avant d'arrêter la file de lots du client
+            await self.contract_handler.aclose()
+            await self.web3_client.aclose()
     
     async def start_sensor_polling(self):
         """Démarre la lecture périodique des capteurs"""
@@ -109,12 +174,12 @@ class RodioNode:
             # Lecture des données
             raw_data = await adapter.read_data()
             
-            if not adapter.validate_data(raw_data):
+            # Validation et transformation en une passe
+            processed_data = adapter.validate_and_transform(raw_data)
+            if processed_data is None:
                 logging.warning(f"⚠️ Données invalides pour {sensor_name}")
                 return
             
-            # Transformation des données
-            processed_data = adapter.transform_data(raw_data)
             self.metrics['readings_count'] += 1
             
             logging.info(f"📊 {sensor_name}: {processed_data['value']} {processed_data.get('unit', '')}")
@@ -141,34 +206,54 @@ class RodioNode:
             logging.error(f"❌ Erreur traitement {sensor_name}: {e}")
     
     async def collect_peer_readings(self, sensor_name: str) -> List[SensorReading]:
-        """Collecte les lectures des nœuds pairs"""
-        peer_readings = []
+        """Collecte les lectures des nœuds pairs (appels concurrents)"""
+        results = await asyncio.gather(
+            *(self._fetch_peer(sensor_name, peer_url) for peer_url in self.peer_nodes),
+            return_exceptions=True
+        )
         
-        for peer_url in self.peer_nodes:
-            try:
-                # Simulation d'appel HTTP aux pairs
-                # En réalité, on ferait un appel HTTP/gRPC
-                import random
-                simulated_value = 23.0 + random.uniform(-2, 2)  # Simulation
-                
-                reading = SensorReading(
-                    value=simulated_value,
-                    timestamp=int(time.time()),
-                    node_id=f"peer_{peer_url.split(':')[-1]}",
-                    signature="simulated_signature"
-                )
-                peer_readings.append(reading)
-                
-            except Exception as e:
-                logging.warning(f"⚠️ Impossible de contacter le pair {peer_url}: {e}")
+        peer_readings = []
+        for peer_url, result in zip(self.peer_nodes, results):
+            if isinstance(result, Exception):
+                logging.warning(f"⚠️ Impossible de contacter le pair {peer_url}: {result!r}")
+            else:
+                peer_readings.append(result)
         
         return peer_readings
     
+    async def _fetch_peer(self, sensor_name: str, peer_url: str) -> SensorReading:
+        """Récupère la lecture d'un pair pour un capteur"""
+        if self._session is not None:
+            async def fetch() -> SensorReading:
+                async with self._session.get(f"{peer_url}/reading/{sensor_name}") as response:
+                    response.raise_for_status()
+                    return SensorReading(**orjson.loads(await response.read()))
+            
+            return await asyncio.wait_for(fetch(), self.peer_timeout)
+        
+        # Simulation d'appel HTTP aux pairs
+        import random
+        simulated_value = 23.0 + random.uniform(-2, 2)  # Simulation
+        
+        return SensorReading(
+            value=simulated_value,
+            timestamp=int(time.time()),
+            node_id=f"peer_{peer_url.split(':')[-1]}",
+            signature="simulated_signature"
+        )
+    
     async def process_consensus(self, sensor_name: str, readings: List[SensorReading]):
         """Traite le consensus et soumet à la blockchain"""
         try:
+            # Lot en colonnes construit une fois, pré-filtré avant l'agrégation
+            batch = SensorReadingBatch.from_readings(readings)
+            mask = self._sigma_mask(sensor_name, batch.values)
+            kept = int(np.count_nonzero(mask))
+            if kept < batch.values.size and kept >= self.aggregator.min_nodes:
+                batch = batch.select(mask)
+            
             # Agrégation avec consensus
-            aggregated_data = await self.aggregator.aggregate_readings(readings)
+            aggregated_data = await self.aggregator.aggregate_readings(batch)
             
             logging.info(f"✅ Consensus atteint pour {sensor_name}: {aggregated_data['value']} (Confidence: {aggregated_data['confidence']:.1%})")
             
@@ -179,6 +264,10 @@ class RodioNode:
                 timestamp=aggregated_data['timestamp']
             )
             
+            if tx_hash is None:
+                logging.info(f"⏳ Soumission différée pour {sensor_name} (gas trop cher)")
+                return
+            
             self.metrics['successful_submissions'] += 1
             logging.info(f"🔗 Données soumises à la blockchain: {tx_hash}")
             
@@ -186,12 +275,37 @@ class RodioNode:
             self.metrics['consensus_failures'] += 1
             logging.error(f"❌ Échec du consensus pour {sensor_name}: {e}")
     
+    def _on_deferred_submitted(self, sensor_name: str, tx_hash: str):
+        """Comptabilise une soumission différée envoyée après la baisse du gas"""
+        self.metrics['successful_submissions'] += 1
+        logging.info(f"🔗 Données différées soumises pour {sensor_name}: {tx_hash}")
+    
+    def _sigma_mask(self, sensor_name: str, values: np.ndarray) -> np.ndarray:
+        """Masque des lectures à moins de c·λ·σ de la médiane (σ robuste = 1.4826·MAD)"""
+        # Médiane/MAD : une valeur aberrante ne gonfle pas l'échelle (µ/σ classiques ne
+        # peuvent rien rejeter pour n <= 5, car max |x-µ|/σ = √(n-1))
+        median = np.median(values)
+        deviation = np.abs(values - median)
+        mad = float(np.median(deviation))
+        
+        lam, prev_mad = self._lambda.get(sensor_name, (1.0, None))
+        if prev_mad is not None:
+            # Dispersion en hausse -> seuil élargi, puis retour progressif vers c·σ
+            # (jamais plus strict que c·σ pour ne pas rejeter des lectures saines)
+            lam = min(max(lam * mad / max(prev_mad, 1e-9), 1.0), 3.0)
+        self._lambda[sensor_name] = (lam, mad)
+        
+        sigma = 1.4826 * mad
+        if sigma == 0:
+            # Majorité de valeurs identiques : repli sur la tolérance relative de l'agrégateur
+            sigma = abs(median) * self.aggregator.outlier_tolerance
+        return deviation <= self.sigma_c * lam * sigma
+    
     def sign_data(self, data: Dict) -> str:
         """Signe cryptographiquement les données"""
         # Implémentation simplifiée - en réalité utiliser ECDSA
-        import hashlib
-        data_str = json.dumps(data, sort_keys=True)
-        return hashlib.sha256(f"{self.node_id}:{data_str}".encode()).hexdigest()
+        # Le timestamp reste dans la charge signée (protection contre le rejeu)
+        return _sign_canonical(self.node_id, orjson.dumps(data, option=_SIGN_OPTIONS))
     
     async def start_peer_communication(self):
         """Gère la communication avec les pairs"""
@@ -239,7 +353,7 @@ class RodioNode:
                     logging.error("❌ Stake insuffisant détecté!")
                 
                 # Log des métriques
-                uptime = time.time() - self.metrics['uptime_start']
+                uptime = time.monotonic() - self.metrics['uptime_start']
                 logging.info(f"📈 Métriques - Uptime: {uptime:.0f}s, Lectures: {self.metrics['readings_count']}, Soumissions: {self.metrics['successful_submissions']}")
                 
                 await asyncio.sleep(300)  # Check toutes les 5 minutes
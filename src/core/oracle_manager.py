@@ -5,20 +5,28 @@ Orchestration des composants et logique métier
 
 import asyncio
 import logging
-from typing import Dict, List, Any, Optional
-from datetime import datetime
+from time import time as _now
+from typing import Dict, List, Any, Optional, TYPE_CHECKING
 
-from src.config.settings import Settings
+import numpy as np
+
+from src.config.settings import FrozenSettings
 from src.blockchain.web3_client import Web3Client
 from src.core.aggregator import DataAggregator
 from src.security.staking import StakingManager
 
+if TYPE_CHECKING:
+    from src.api.routes.sensors import SensorReading
+
 logger = logging.getLogger(__name__)
 
 class OracleManager:
     """Gestionnaire principal de l'Oracle RODIO"""
     
-    def __init__(self, settings: Settings):
+    # Nombre max d'entrées d'historique simulées
+    HISTORY_MAX_ENTRIES = 10
+    
+    def __init__(self, settings: FrozenSettings):
         self.settings = settings
         self.web3_client = None
         self.aggregator = None
@@ -31,7 +39,7 @@ class OracleManager:
             "successful_consensus": 0,
             "failed_consensus": 0,
             "active_sensors": set(),
-            "start_time": datetime.now().timestamp()
+            "start_time": _now()
         }
     
     async def initialize(self):
@@ -60,13 +68,13 @@ class OracleManager:
             logger.error(f"❌ Erreur lors de l'initialisation: {e}")
             raise
     
-    async def submit_sensor_data(self, sensor_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Soumet des données de capteur pour consensus"""
+    async def submit_sensor_data(self, reading: "SensorReading") -> Dict[str, Any]:
+        """Soumet des données de capteur pour consensus (modèle lu par attributs)"""
         if not self.is_initialized:
             raise Exception("Oracle Manager non initialisé")
         
         try:
-            sensor_id = sensor_data["sensor_id"]
+            sensor_id = reading.sensor_id
             self.metrics["active_sensors"].add(sensor_id)
             self.metrics["total_submissions"] += 1
             
@@ -74,14 +82,14 @@ class OracleManager:
             
             # Simulation du processus de consensus
             # En réalité, ceci impliquerait la communication avec d'autres nœuds
-            consensus_result = await self._simulate_consensus(sensor_data)
+            consensus_result = await self._simulate_consensus(reading.value)
             
             if consensus_result["success"]:
                 # Soumission à la blockchain
                 tx_hash = await self.web3_client.submit_to_blockchain(
                     sensor_id,
                     consensus_result["value"],
-                    sensor_data["timestamp"]
+                    reading.timestamp
                 )
                 
                 self.metrics["successful_consensus"] += 1
@@ -97,10 +105,10 @@ class OracleManager:
                 raise Exception("Consensus non atteint")
                 
         except Exception as e:
-            logger.error(f"❌ Erreur soumission capteur {sensor_data.get('sensor_id')}: {e}")
+            logger.error(f"❌ Erreur soumission capteur {reading.sensor_id}: {e}")
             raise
     
-    async def _simulate_consensus(self, sensor_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def _simulate_consensus(self, original_value: float) -> Dict[str, Any]:
         """Simule le processus de consensus (à remplacer par la vraie logique)"""
         # Simulation simple - en réalité, ceci impliquerait:
         # 1. Communication avec les nœuds pairs
@@ -115,7 +123,6 @@ class OracleManager:
         
         if success:
             # Petite variation autour de la valeur originale
-            original_value = sensor_data["value"]
             consensus_value = original_value + random.uniform(-0.1, 0.1)
             
             return {
@@ -139,39 +146,53 @@ class OracleManager:
         return {
             "sensor_id": sensor_id,
             "value": 23.5,
-            "timestamp": int(datetime.now().timestamp()) - 300,
+            "timestamp": int(_now()) - 300,
             "block_number": 18500000,
             "confidence": 0.95
         }
     
     async def get_sensor_history(self, sensor_id: str, limit: int) -> List[Dict[str, Any]]:
         """Récupère l'historique d'un capteur"""
+        columns = await self.get_sensor_history_columns(sensor_id, limit)
+        
+        return [
+            {
+                "sensor_id": sensor_id,
+                "value": value,
+                "timestamp": timestamp,
+                "block_number": block_number,
+                "confidence": confidence
+            }
+            for value, timestamp, block_number, confidence in zip(
+                columns["values"], columns["timestamps"], columns["block_numbers"], columns["confidence"]
+            )
+        ]
+    
+    async def get_sensor_history_columns(self, sensor_id: str, limit: int) -> Dict[str, List]:
+        """Récupère l'historique d'un capteur en colonnes (sans un dict par entrée)"""
         if not self.is_initialized:
             raise Exception("Oracle Manager non initialisé")
         
-        # Simulation d'historique
-        history = []
-        base_time = int(datetime.now().timestamp())
-        
-        for i in range(min(limit, 10)):  # Simulation de 10 entrées max
-            history.append({
-                "sensor_id": sensor_id,
-                "value": 23.0 + (i * 0.1),
-                "timestamp": base_time - (i * 300),  # Toutes les 5 minutes
-                "block_number": 18500000 - i,
-                "confidence": 0.95
-            })
+        # Simulation d'historique, colonnes calculées d'un bloc
+        idx = np.arange(min(limit, self.HISTORY_MAX_ENTRIES))
+        base_time = int(_now())
         
-        return history
+        return {
+            "values": (23.0 + idx * 0.1).tolist(),
+            "timestamps": (base_time - idx * 300).tolist(),  # Toutes les 5 minutes
+            "block_numbers": (18500000 - idx).tolist(),
+            "confidence": [0.95] * idx.size
+        }
     
     async def get_active_sensors(self) -> List[Dict[str, Any]]:
         """Liste tous les capteurs actifs"""
         sensors = []
+        now = int(_now())
         for sensor_id in self.metrics["active_sensors"]:
             sensors.append({
                 "sensor_id": sensor_id,
                 "status": "active",
-                "last_reading": int(datetime.now().timestamp()) - 60,
+                "last_reading": now - 60,
                 "total_readings": 100  # Simulation
             })
         
@@ -188,33 +209,34 @@ class OracleManager:
             "active_nodes": 3,  # Simulation
             "threshold": 0.8,
             "success_rate": success_rate,
-            "last_consensus": int(datetime.now().timestamp()) - 30,
+            "last_consensus": int(_now()) - 30,
             "pending": 0
         }
     
     async def get_network_nodes(self) -> List[Dict[str, Any]]:
         """Liste tous les nœuds du réseau"""
         # Simulation de nœuds
+        now = int(_now())
         return [
             {
                 "id": "RODIO_NODE_001",
                 "status": "active",
                 "reputation": 0.95,
                 "stake": 1000,
-                "last_seen": int(datetime.now().timestamp()) - 30
+                "last_seen": now - 30
             },
             {
                 "id": "RODIO_NODE_002", 
                 "status": "active",
                 "reputation": 0.88,
                 "stake": 1500,
-                "last_seen": int(datetime.now().timestamp()) - 45
+                "last_seen": now - 45
             }
         ]
     
     async def get_detailed_metrics(self) -> Dict[str, Any]:
         """Récupère les métriques détaillées"""
-        uptime = datetime.now().timestamp() - self.metrics["start_time"]
+        uptime = _now() - self.metrics["start_time"]
         
         return {
             "uptime_seconds": int(uptime),
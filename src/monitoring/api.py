@@ -4,12 +4,43 @@ import time
 import psutil
 from typing import Dict, Any
 
+NODE_ID = "RODIO_GATEWAY_001"
+
+# Gabarit Prometheus construit une fois : seules les valeurs sont formatées à chaque scrape
+_NODE_LABEL = 'node_id="' + NODE_ID + '"'
+_LABEL = "{{" + _NODE_LABEL + "}}"  # Accolades doublées pour str.format
+_PROM_TEMPLATE = "".join((
+    "# HELP rodio_node_health Node health status (1=healthy, 0=unhealthy)\n",
+    "# TYPE rodio_node_health gauge\n",
+    "rodio_node_health", _LABEL, " 1\n\n",
+    "# HELP rodio_uptime_seconds Node uptime in seconds\n",
+    "# TYPE rodio_uptime_seconds counter\n",
+    "rodio_uptime_seconds", _LABEL, " {uptime}\n\n",
+    "# HELP rodio_sensor_readings_total Total number of sensor readings\n",
+    "# TYPE rodio_sensor_readings_total counter\n",
+    "rodio_sensor_readings_total", _LABEL, " {readings}\n\n",
+    "# HELP rodio_submissions_total Total number of blockchain submissions\n",
+    "# TYPE rodio_submissions_total counter\n",
+    "rodio_submissions_total{{", _NODE_LABEL, ',status="success"}} {submissions_ok}\n',
+    "rodio_submissions_total{{", _NODE_LABEL, ',status="failed"}} {submissions_failed}\n\n',
+    "# HELP rodio_consensus_success_rate Consensus success rate (0-1)\n",
+    "# TYPE rodio_consensus_success_rate gauge\n",
+    "rodio_consensus_success_rate", _LABEL, " {success_rate}\n\n",
+    "# HELP rodio_memory_usage_bytes Memory usage in bytes\n",
+    "# TYPE rodio_memory_usage_bytes gauge\n",
+    "rodio_memory_usage_bytes", _LABEL, " {memory}\n\n",
+    "# HELP rodio_cpu_usage_percent CPU usage percentage\n",
+    "# TYPE rodio_cpu_usage_percent gauge\n",
+    "rodio_cpu_usage_percent", _LABEL, " {cpu}\n",
+)).format
+
 # Simulation d'une API de monitoring simple
 class MonitoringAPI:
     """API de monitoring pour le nœud RODIO"""
     
     def __init__(self):
-        self.start_time = time.time()
+        self.start_time = time.time()  # Horodatage exposé
+        self._start_monotonic = time.monotonic()  # Base du calcul d'uptime
         self.metrics = {
             'requests_count': 0,
             'sensor_readings': 0,
@@ -23,7 +54,7 @@ class MonitoringAPI:
         """Endpoint de vérification de santé"""
         self.metrics['requests_count'] += 1
         
-        uptime = time.time() - self.start_time
+        uptime = time.monotonic() - self._start_monotonic
         
         return {
             "status": "healthy",
@@ -43,40 +74,18 @@ class MonitoringAPI:
         """Endpoint compatible Prometheus"""
         self.metrics['requests_count'] += 1
         
-        uptime = time.time() - self.start_time
+        uptime = time.monotonic() - self._start_monotonic
         success_rate = self.calculate_success_rate()
         
-        prometheus_metrics = f"""# HELP rodio_node_health Node health status (1=healthy, 0=unhealthy)
-# TYPE rodio_node_health gauge
-rodio_node_health{{node_id="RODIO_GATEWAY_001"}} 1
-
-# HELP rodio_uptime_seconds Node uptime in seconds
-# TYPE rodio_uptime_seconds counter
-rodio_uptime_seconds{{node_id="RODIO_GATEWAY_001"}} {int(uptime)}
-
-# HELP rodio_sensor_readings_total Total number of sensor readings
-# TYPE rodio_sensor_readings_total counter
-rodio_sensor_readings_total{{node_id="RODIO_GATEWAY_001"}} {self.metrics['sensor_readings']}
-
-# HELP rodio_submissions_total Total number of blockchain submissions
-# TYPE rodio_submissions_total counter
-rodio_submissions_total{{node_id="RODIO_GATEWAY_001",status="success"}} {self.metrics['successful_submissions']}
-rodio_submissions_total{{node_id="RODIO_GATEWAY_001",status="failed"}} {self.metrics['failed_submissions']}
-
-# HELP rodio_consensus_success_rate Consensus success rate (0-1)
-# TYPE rodio_consensus_success_rate gauge
-rodio_consensus_success_rate{{node_id="RODIO_GATEWAY_001"}} {success_rate}
-
-# HELP rodio_memory_usage_bytes Memory usage in bytes
-# TYPE rodio_memory_usage_bytes gauge
-rodio_memory_usage_bytes{{node_id="RODIO_GATEWAY_001"}} {self.get_memory_usage()}
-
-# HELP rodio_cpu_usage_percent CPU usage percentage
-# TYPE rodio_cpu_usage_percent gauge
-rodio_cpu_usage_percent{{node_id="RODIO_GATEWAY_001"}} {self.get_cpu_usage()}
-"""
-        
-        return prometheus_metrics
+        return _PROM_TEMPLATE(
+            uptime=int(uptime),
+            readings=self.metrics['sensor_readings'],
+            submissions_ok=self.metrics['successful_submissions'],
+            submissions_failed=self.metrics['failed_submissions'],
+            success_rate=success_rate,
+            memory=self.get_memory_usage(),
+            cpu=self.get_cpu_usage()
+        )
     
     async def get_detailed_status(self) -> Dict[str, Any]:
         """Status détaillé du nœud"""
@@ -88,7 +97,7 @@ rodio_cpu_usage_percent{{node_id="RODIO_GATEWAY_001"}} {self.get_cpu_usage()}
                 "version": "1.0.0",
                 "network": "polygon",
                 "start_time": self.start_time,
-                "uptime": time.time() - self.start_time
+                "uptime": time.monotonic() - self._start_monotonic
             },
             "performance": {
                 "cpu_usage": self.get_cpu_usage(),
@@ -1,10 +1,12 @@
 import time
 import asyncio
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Sequence
 from dataclasses import dataclass, field
 from collections import defaultdict, deque
 
+import numpy as np
+
 @dataclass
 class MetricPoint:
     """Point de métrique avec timestamp"""
@@ -126,17 +128,20 @@ class MetricsCollector:
     
     def get_percentile(self, histogram_name: str, percentile: float) -> float:
         """Calcule un percentile d'un histogramme"""
-        if histogram_name not in self.histograms:
-            return 0.0
-        
-        values = sorted(self.histograms[histogram_name])
+        return self.get_percentiles(histogram_name, (percentile,))[0]
+    
+    def get_percentiles(self, histogram_name: str, percentiles: Sequence[float]) -> List[float]:
+        """Calcule plusieurs percentiles d'un histogramme en une seule sélection partielle"""
+        values = self.histograms.get(histogram_name)
         if not values:
-            return 0.0
+            return [0.0] * len(percentiles)
         
-        index = int((percentile / 100.0) * len(values))
-        index = min(index, len(values) - 1)
+        n = len(values)
+        indices = [min(int((p / 100.0) * n), n - 1) for p in percentiles]
         
-        return values[index]
+        # Sélection O(n) des rangs voulus au lieu d'un tri complet
+        partitioned = np.partition(np.asarray(values, dtype=np.float64), indices)
+        return [float(partitioned[i]) for i in indices]
     
     async def collect_system_metrics(self):
         """Collecte les métriques système en continu"""
@@ -242,9 +247,10 @@ class MetricsCollector:
         for hist_name, values in self.histograms.items():
             if values:
                 lines.append(f"# TYPE {hist_name} histogram")
-                lines.append(f"{hist_name}_p50 {self.get_percentile(hist_name, 50)}")
-                lines.append(f"{hist_name}_p95 {self.get_percentile(hist_name, 95)}")
-                lines.append(f"{hist_name}_p99 {self.get_percentile(hist_name, 99)}")
+                p50, p95, p99 = self.get_percentiles(hist_name, (50, 95, 99))
+                lines.append(f"{hist_name}_p50 {p50}")
+                lines.append(f"{hist_name}_p95 {p95}")
+                lines.append(f"{hist_name}_p99 {p99}")
         
         return "\n".join(lines)
     
@@ -1,7 +1,11 @@
 import pytest
 import asyncio
+import contextlib
+import time
+import numpy as np
 from unittest.mock import Mock, patch
-from src.adapters.temperature_adapter import TemperatureAdapter
+import src.adapters.temperature_adapter as temperature_module
+from src.adapters.temperature_adapter import TemperatureAdapter, StaleReadingError
 from src.adapters.humidity_adapter import HumidityAdapter
 from src.adapters.gps_adapter import GPSAdapter
 
@@ -11,6 +15,7 @@ class TestTemperatureAdapter:
     def setup_method(self):
         config = {
             'mqtt_topic': 'sensors/test/temperature',
+            'simulated_latency': 0,
             'min_temperature': -50.0,
             'max_temperature': 100.0,
             'unit': 'celsius'
@@ -27,6 +32,18 @@ class TestTemperatureAdapter:
         assert 'sensor_id' in data
         assert isinstance(data['raw_value'], (int, float))
     
+    @pytest.mark.asyncio
+    async def test_read_data_refills_buffer(self):
+        """Test du renouvellement du tampon de tirages aléatoires"""
+        await self.adapter.read_data()
+        self.adapter._idx = self.adapter._BUF_SIZE
+        
+        data = await self.adapter.read_data()
+        
+        assert self.adapter._idx == 1
+        assert data['quality'] in ('good', 'fair', 'poor')
+        assert 20 <= data['battery_level'] <= 100
+    
     def test_validate_data_valid(self):
         """Test validation avec données valides"""
         valid_data = {
@@ -74,6 +91,92 @@ class TestTemperatureAdapter:
         assert transformed['unit'] == 'celsius'
         assert 'timestamp' in transformed
         assert 'quality_score' in transformed
+    
+    def test_validate_and_transform(self):
+        """Test validation + transformation fusionnées"""
+        raw_data = {
+            'raw_value': 23.5,
+            'unit': 'celsius',
+            'sensor_id': 'temp_001',
+            'quality': 'fair',
+            'battery_level': 40
+        }
+        
+        transformed = self.adapter.validate_and_transform(raw_data)
+        
+        assert transformed == {**self.adapter.transform_data(raw_data), 'timestamp': transformed['timestamp']}
+        assert self.adapter.validate_and_transform({**raw_data, 'quality': 'poor'}) is None
+        assert self.adapter.validate_and_transform({**raw_data, 'battery_level': 5}) is None
+
+class FakeMQTTMessage:
+    def __init__(self, payload: bytes):
+        self.payload = payload
+
+class FakeMQTTClient:
+    """Client MQTT factice : publie une liste de messages puis reste connecté"""
+    
+    payloads = []
+    instances = []
+    
+    def __init__(self, *args, **kwargs):
+        self.kwargs = kwargs
+        FakeMQTTClient.instances.append(self)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+    
+    async def subscribe(self, topic, qos=0):
+        pass
+    
+    @contextlib.asynccontextmanager
+    async def filtered_messages(self, topic):
+        async def messages():
+            for payload in FakeMQTTClient.payloads:
+                yield FakeMQTTMessage(payload)
+            await asyncio.Event().wait()
+        yield messages()
+
+class TestTemperatureAdapterMQTT:
+    """Tests du chemin MQTT réel de l'adapter de température"""
+    
+    def setup_method(self):
+        FakeMQTTClient.instances = []
+        self.config = {
+            'mqtt_topic': 'sensors/temp_room_01/temperature',
+            'mqtt_broker': 'localhost',
+            'mqtt_username': 'rodio',
+            'mqtt_password': 'secret',
+            'max_message_age': 0.05
+        }
+    
+    @pytest.mark.asyncio
+    async def test_live_reading_and_staleness(self, monkeypatch):
+        """Messages malformés ignorés, sensor_id du message conservé, mesure périmée rejetée"""
+        monkeypatch.setattr(temperature_module, 'MQTTClient', FakeMQTTClient)
+        FakeMQTTClient.payloads = [b'{bad', b'[1]', b'{"value": 21.5, "sensor_id": "temp_room_01"}']
+        adapter = TemperatureAdapter(self.config)
+        
+        try:
+            data = await adapter.read_data()
+            assert data['raw_value'] == 21.5
+            assert data['sensor_id'] == 'temp_room_01'
+            assert FakeMQTTClient.instances[0].kwargs['username'] == 'rodio'
+            
+            await asyncio.sleep(0.1)
+            with pytest.raises(StaleReadingError):
+                await adapter.read_data()
+        finally:
+            await adapter.aclose()
+        assert adapter._mqtt_task is None
+    
+    def test_wildcard_topic_rejected(self, monkeypatch):
+        """Un topic joker mélangerait plusieurs capteurs"""
+        monkeypatch.setattr(temperature_module, 'MQTTClient', FakeMQTTClient)
+        with pytest.raises(ValueError):
+            TemperatureAdapter({**self.config, 'mqtt_topic': 'sensors/+/temperature'})
 
 class TestHumidityAdapter:
     """Tests pour l'adapter d'humidité"""
@@ -81,6 +184,7 @@ class TestHumidityAdapter:
     def setup_method(self):
         config = {
             'mqtt_topic': 'sensors/test/humidity',
+            'simulated_latency': 0,
             'min_humidity': 0.0,
             'max_humidity': 100.0
         }
@@ -96,6 +200,15 @@ class TestHumidityAdapter:
         assert data['unit'] == 'percent'
         assert isinstance(data['raw_value'], (int, float))
     
+    @pytest.mark.asyncio
+    async def test_read_data_batch(self):
+        """Test de lecture groupée des données d'humidité"""
+        batch = await self.adapter.read_data_batch(32)
+        
+        assert batch['raw_value'].shape == (32,)
+        assert batch['calibration_offset'].shape == (32,)
+        assert batch['unit'] == 'percent'
+    
     def test_validate_data_valid(self):
         """Test validation avec données valides"""
         valid_data = {'raw_value': 65.5}
@@ -120,6 +233,15 @@ class TestHumidityAdapter:
         assert transformed['sensor_type'] == 'humidity'
         assert transformed['value'] == 67.0  # 65 + 2
         assert transformed['unit'] == 'percent'
+    
+    def test_validate_and_transform(self):
+        """Test validation + transformation fusionnées"""
+        raw_data = {'raw_value': 65.0, 'sensor_id': 'hum_001', 'calibration_offset': 2.0}
+        
+        transformed = self.adapter.validate_and_transform(raw_data)
+        
+        assert transformed == {**self.adapter.transform_data(raw_data), 'timestamp': transformed['timestamp']}
+        assert self.adapter.validate_and_transform({'raw_value': 150.0}) is None
 
 class TestGPSAdapter:
     """Tests pour l'adapter GPS"""
@@ -127,6 +249,7 @@ class TestGPSAdapter:
     def setup_method(self):
         config = {
             'mqtt_topic': 'sensors/test/gps',
+            'simulated_latency': 0,
             'base_latitude': 48.8566,
             'base_longitude': 2.3522
         }
@@ -143,6 +266,16 @@ class TestGPSAdapter:
         assert 'hdop' in data
         assert 'fix_quality' in data
     
+    @pytest.mark.asyncio
+    async def test_read_data_batch(self):
+        """Test de lecture groupée des données GPS"""
+        batch = await self.adapter.read_data_batch(32)
+        
+        assert batch['latitude'].shape == (32,)
+        assert batch['satellites'].shape == (32,)
+        no_fix = batch['fix_quality'] == 'NO_FIX'
+        assert (batch['satellites'][~no_fix] >= 4).all()
+    
     def test_validate_data_valid_gps(self):
         """Test validation avec fix GPS valide"""
         valid_data = {
@@ -201,6 +334,34 @@ class TestGPSAdapter:
         assert 'latitude' in transformed['value']
         assert 'longitude' in transformed['value']
         assert 'accuracy' in transformed['value']
+    
+    def test_validate_and_transform(self):
+        """Test validation + transformation fusionnées"""
+        raw_data = {
+            'latitude': 48.8566,
+            'longitude': 2.3522,
+            'satellites': 8,
+            'hdop': 1.2,
+            'fix_quality': 'GPS',
+            'timestamp_gps': 1700000000,
+            'sensor_id': 'gps_001'
+        }
+        
+        assert self.adapter.validate_and_transform(raw_data) == self.adapter.transform_data(raw_data)
+        assert self.adapter.validate_and_transform({**raw_data, 'hdop': 6.0}) is None
+        assert self.adapter.validate_and_transform({**raw_data, 'fix_quality': 'NO_FIX'}) is None
+    
+    def test_gps_quality_tiers(self):
+        """Test du score de qualité GPS par paliers (scalaire et batch)"""
+        assert self.adapter._calculate_gps_quality({'hdop': 1.0, 'satellites': 6}) == 1.0
+        assert self.adapter._calculate_gps_quality({'hdop': 1.6, 'satellites': 9}) == 0.99
+        assert self.adapter._calculate_gps_quality({'hdop': 2.5, 'satellites': 4}) == 0.56
+        
+        scores = self.adapter._calculate_gps_quality({
+            'hdop': np.array([1.0, 2.5]),
+            'satellites': np.array([9, 4])
+        })
+        assert scores.tolist() == [1.0, 0.56]
 
 class TestAdapterIntegration:
     """Tests d'intégration des adapters"""
@@ -208,9 +369,9 @@ class TestAdapterIntegration:
     @pytest.mark.asyncio
     async def test_multiple_adapters_concurrent(self):
         """Test de lecture simultanée de plusieurs adapters"""
-        temp_adapter = TemperatureAdapter({'mqtt_topic': 'sensors/temp'})
-        hum_adapter = HumidityAdapter({'mqtt_topic': 'sensors/hum'})
-        gps_adapter = GPSAdapter({'mqtt_topic': 'sensors/gps'})
+        temp_adapter = TemperatureAdapter({'mqtt_topic': 'sensors/temp', 'simulated_latency': 0})
+        hum_adapter = HumidityAdapter({'mqtt_topic': 'sensors/hum', 'simulated_latency': 0})
+        gps_adapter = GPSAdapter({'mqtt_topic': 'sensors/gps', 'simulated_latency': 0})
         
         # Lecture simultanée
         results = await asyncio.gather(
@@ -234,5 +395,5 @@ class TestAdapterIntegration:
         
         assert stats['sensor_type'] == 'temperature'
         assert stats['reading_count'] == 2
-        assert 'last_reading_time' in stats
+        assert abs(stats['last_reading_time'] - time.time()) < 5  # Horodatage epoch
         assert 'polling_interval' in stats
\ No newline at end of file
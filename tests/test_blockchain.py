@@ -0,0 +1,285 @@
+import pytest
+import asyncio
+import logging
+import time
+import orjson
+
+from src.blockchain.contract_handler import AsyncContractHandler
+from src.blockchain.web3_client import Web3Client, RPCError, InsufficientGasError
+
+def make_client(**overrides) -> Web3Client:
+    config = {
+        'blockchain_rpc': 'http://127.0.0.1:8545',
+        'contract_address': '0x1234567890123456789012345678901234567890',
+        **overrides
+    }
+    return Web3Client(config)
+
+class TestWeb3ClientHTTP:
+    """Tests des lectures JSON-RPC sur session HTTP persistante"""
+
+    @pytest.mark.asyncio
+    async def test_block_number_and_gas_price(self):
+        """eth_blockNumber / eth_gasPrice décodés, une seule session réutilisée"""
+        web = pytest.importorskip("aiohttp.web")
+        calls = []
+
+        async def handler(request):
+            body = orjson.loads(await request.read())
+            calls.append(body['method'])
+            results = {'eth_blockNumber': '0x10', 'eth_gasPrice': '0x3b9aca00'}
+            if body['method'] not in results:
+                return web.json_response({'jsonrpc': '2.0', 'id': body['id'], 'error': {'message': 'unsupported'}})
+            return web.json_response({'jsonrpc': '2.0', 'id': body['id'], 'result': results[body['method']]})
+
+        app = web.Application()
+        app.router.add_post('/', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        client = make_client(blockchain_rpc=f'http://127.0.0.1:{port}/', rpc_transport='http')
+        try:
+            assert await client.get_latest_block() == 16
+            assert await client.get_gas_price() == 10 ** 9
+            session = client._session
+            await client.get_gas_price()
+            assert client._session is session
+            with pytest.raises(RPCError):
+                await client._rpc_call('eth_chainId')
+            assert calls[:2] == ['eth_blockNumber', 'eth_blockNumber']
+        finally:
+            await client.aclose()
+            await runner.cleanup()
+
+        assert client._session is None
+
+class BatchRecordingClient(Web3Client):
+    """Client dont l'aller-retour JSON-RPC est remplacé par un enregistrement des lots"""
+
+    def __init__(self, *args, hang: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = []
+        self.hang = hang
+
+    async def _post_batch(self, requests):
+        self.batches.append(requests)
+        if self.hang:
+            await asyncio.Event().wait()
+        # Réponses dans le désordre : la correspondance se fait par id
+        return [
+            {'jsonrpc': '2.0', 'id': r['id'], 'result': f"0x{r['params'][0]['n']:064x}"}
+            for r in reversed(requests)
+        ]
+
+class TestWeb3ClientBatching:
+    """Tests de la coalescence des transactions en lots JSON-RPC"""
+
+    def make(self, **kwargs) -> BatchRecordingClient:
+        return BatchRecordingClient({
+            'blockchain_rpc': 'http://127.0.0.1:8545',
+            'contract_address': '0x1234567890123456789012345678901234567890',
+            'rpc_batch_size': 32,
+            'rpc_batch_delay_ms': 20
+        }, **kwargs)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_sends_share_one_batch(self):
+        """Envois concurrents : un seul lot, chaque appelant reçoit son propre hash"""
+        client = self.make()
+        client.connected = True
+        try:
+            hashes = await asyncio.gather(*(client.send_transaction({'n': n}) for n in range(10)))
+        finally:
+            await client.aclose()
+
+        assert len(client.batches) == 1
+        assert len(client.batches[0]) == 10
+        assert hashes == [f"0x{n:064x}" for n in range(10)]
+        assert client.transaction_count == 10
+
+    @pytest.mark.asyncio
+    async def test_batch_size_splits_batches(self):
+        """Au-delà de rpc_batch_size, la file est drainée en plusieurs lots"""
+        client = self.make()
+        client.connected = True
+        client.batch_size = 4
+        try:
+            await asyncio.gather(*(client.send_transaction({'n': n}) for n in range(10)))
+        finally:
+            await client.aclose()
+
+        assert [len(batch) for batch in client.batches] == [4, 4, 2]
+
+    @pytest.mark.asyncio
+    async def test_aclose_fails_pending_sends(self):
+        """aclose : les envois du lot en cours et de la file échouent au lieu de bloquer"""
+        client = self.make(hang=True)
+        client.connected = True
+        client.batch_size = 2
+        sends = [asyncio.ensure_future(client.send_transaction({'n': n})) for n in range(5)]
+        await asyncio.sleep(0.05)
+
+        await client.aclose()
+        results = await asyncio.wait_for(asyncio.gather(*sends, return_exceptions=True), 1)
+
+        assert len(client.batches) == 1
+        assert all(isinstance(result, ConnectionError) for result in results)
+
+class StubWeb3:
+    """Web3Client factice pour AsyncContractHandler"""
+
+    def __init__(self, gas_price_gwei: float = 20, fail_sends=(), estimate: int = 180000):
+        self.gas_price = int(gas_price_gwei * 1e9)
+        self.fail_sends = list(fail_sends)  # Exception (ou None) par envoi, dans l'ordre
+        self.estimate = estimate
+        self.gas_sequence = []  # Prix successifs (gwei) avant de revenir à gas_price
+        self.on_send = None
+        self.sent = []
+        self.estimates = 0
+
+    async def get_gas_price(self):
+        if self.gas_sequence:
+            return int(self.gas_sequence.pop(0) * 1e9)
+        return self.gas_price
+
+    async def estimate_gas(self, transaction_data):
+        self.estimates += 1
+        if isinstance(self.estimate, Exception):
+            raise self.estimate
+        return self.estimate
+
+    async def send_transaction(self, transaction_data):
+        self.sent.append(dict(transaction_data))
+        if self.on_send is not None:
+            self.on_send(transaction_data)
+        error = self.fail_sends.pop(0) if self.fail_sends else None
+        if error is not None:
+            raise error
+        return f"0x{len(self.sent):064x}"
+
+    async def wait_for_confirmation(self, tx_hash):
+        return True
+
+class TestContractHandlerGas:
+    """Tests du gas en cache et du nouvel essai après InsufficientGasError"""
+
+    @pytest.mark.asyncio
+    async def test_cached_gas_limit(self):
+        """Premier envoi au gas par défaut, estimation en arrière-plan puis réutilisée"""
+        web3 = StubWeb3()
+        handler = AsyncContractHandler(web3)
+
+        await handler.submit_data_async('temperature', 23.5, 1700000000)
+        await asyncio.sleep(0)
+        await handler.submit_data_async('temperature', 23.6, 1700000001)
+        await handler.aclose()
+
+        assert [tx['gas_limit'] for tx in web3.sent] == [handler.DEFAULT_GAS_LIMIT, 180000]
+        assert web3.estimates == 1
+
+    @pytest.mark.asyncio
+    async def test_insufficient_gas_retried_once(self):
+        """InsufficientGasError : ré-estimation puis un unique nouvel essai"""
+        web3 = StubWeb3(fail_sends=[InsufficientGasError("Transaction failed: insufficient gas")])
+        handler = AsyncContractHandler(web3)
+        handler._gas_cache['submitData'] = (100000, time.monotonic())
+
+        tx_hash = await handler.submit_data_async('temperature', 23.5, 1700000000)
+        await handler.aclose()
+
+        assert tx_hash == f"0x{2:064x}"
+        assert [tx['gas_limit'] for tx in web3.sent] == [100000, 180000]
+        assert handler._gas_cache['submitData'][0] == 180000
+
+    @pytest.mark.asyncio
+    async def test_other_rpc_errors_not_retried(self):
+        """Une autre erreur RPC remonte sans nouvel essai"""
+        web3 = StubWeb3(fail_sends=[RPCError("Transaction failed: nonce too low")])
+        handler = AsyncContractHandler(web3)
+
+        with pytest.raises(RPCError):
+            await handler.submit_data_async('temperature', 23.5, 1700000000)
+        await handler.aclose()
+
+        assert len(web3.sent) == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_logged_and_cancelled(self, caplog):
+        """Un rafraîchissement en échec est journalisé ; aclose annule ceux en cours"""
+        web3 = StubWeb3(estimate=RuntimeError("rpc down"))
+        handler = AsyncContractHandler(web3)
+
+        with caplog.at_level(logging.WARNING):
+            assert handler._cached_gas_limit('submitData') == handler.DEFAULT_GAS_LIMIT
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+        assert any("Ré-estimation du gas échouée" in r.message for r in caplog.records)
+
+        web3.estimate = 180000
+        handler._cached_gas_limit('updateStake')
+        pending = handler._gas_refresh['updateStake']
+        await handler.aclose()
+        await asyncio.sleep(0)
+        assert pending.cancelled()
+        assert not handler._gas_refresh
+
+class TestContractHandlerDeferred:
+    """Tests des soumissions différées quand le gas dépasse le plafond"""
+
+    def make(self, web3: StubWeb3, **kwargs) -> AsyncContractHandler:
+        self.submitted = []
+        handler = AsyncContractHandler(
+            web3, max_gas_price_gwei=50,
+            on_deferred_submitted=lambda sensor_id, tx_hash: self.submitted.append(sensor_id),
+            **kwargs
+        )
+        handler.GAS_PRICE_RECHECK_INTERVAL = 0.01
+        handler.MAX_BATCH_SIZE = 2
+        return handler
+
+    @pytest.mark.asyncio
+    async def test_only_failed_chunk_redeferred(self):
+        """Gas trop cher puis bas : seul le lot en échec est remis en attente, sans écraser une valeur plus récente"""
+        web3 = StubWeb3(gas_price_gwei=100, fail_sends=[None, RPCError("Transaction failed: nonce too low")])
+        handler = self.make(web3)
+
+        for i in range(4):
+            assert await handler.submit_data_async(f"s{i}", 20.0 + i, 1700000000 + i) is None
+        assert web3.sent == []
+        assert set(handler._deferred) == {"s0", "s1", "s2", "s3"}
+
+        def defer_newer(transaction):
+            # Valeur plus récente de s3 arrivée pendant l'envoi du lot en échec
+            if "s3" in transaction['parameters']['sensorIds']:
+                handler._defer_submission("s3", 99.0, 1700000099)
+
+        web3.on_send = defer_newer
+        web3.gas_sequence = [10]  # Une seule vérification sous le plafond
+        await asyncio.sleep(0.05)
+
+        assert [tx['parameters']['sensorIds'] for tx in web3.sent] == [["s0", "s1"], ["s2", "s3"]]
+        assert sorted(self.submitted) == ["s0", "s1"]
+        assert set(handler._deferred) == {"s2", "s3"}
+        assert handler._deferred["s2"][:2] == (22.0, 1700000002)
+        assert handler._deferred["s3"][:2] == (99.0, 1700000099)
+        assert len(handler._pending_confirm) <= 2
+
+        await handler.aclose()
+
+    @pytest.mark.asyncio
+    async def test_stale_submission_flushed_despite_gas(self):
+        """Au-delà de max_staleness, la donnée est soumise même si le gas reste cher"""
+        web3 = StubWeb3(gas_price_gwei=100)
+        handler = self.make(web3, max_staleness=0.02)
+
+        await handler.submit_data_async("s0", 21.0, 1700000000)
+        await asyncio.sleep(0.1)
+
+        assert [tx['parameters']['sensorIds'] for tx in web3.sent] == [["s0"]]
+        assert self.submitted == ["s0"]
+        assert handler._deferred == {}
+
+        await handler.aclose()
@@ -1,7 +1,7 @@
 import pytest
 import time
 from unittest.mock import Mock, AsyncMock
-from src.core.aggregator import DataAggregator, SensorReading, ConsensusError
+from src.core.aggregator import DataAggregator, SensorReading, SensorReadingBatch, ConsensusError
 
 class TestDataAggregator:
     """Tests pour l'agrégateur de données avec consensus"""
@@ -91,6 +91,21 @@ class TestDataAggregator:
         assert len(validated) == 2  # Seulement les signatures valides
         assert all(len(r.signature) == 64 for r in validated)
     
+    def test_validate_signatures_batch(self):
+        """Test de validation des signatures sur un lot en colonnes"""
+        batch = SensorReadingBatch.from_readings([
+            SensorReading(23.1, 100, "node1", "a" * 64),
+            SensorReading(23.2, 200, "node2", "invalid"),
+            SensorReading(23.3, 300, "node3", "b" * 64),
+        ])
+        
+        validated = self.aggregator.validate_signatures(batch)
+        
+        assert len(validated) == 2
+        assert list(validated.node_ids) == ["node1", "node3"]
+        assert validated.values.tolist() == [23.1, 23.3]
+        assert validated.timestamps.tolist() == [100, 300]
+    
     def test_remove_outliers_iqr(self):
         """Test de suppression d'outliers avec méthode IQR"""
         values = [20, 21, 22, 23, 24, 25, 100]  # 100 est un outlier évident
@@ -0,0 +1,114 @@
+import pytest
+import asyncio
+import logging
+from collections import deque
+from types import SimpleNamespace
+
+pytest.importorskip("fastapi")
+
+from src.api.middleware import RateLimitMiddleware
+
+class FakeRedis:
+    """Redis minimal : exécute le script de rate limiting en mémoire"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.counters = {}
+        self.expires = {}
+
+    async def eval(self, script, numkeys, key, period):
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.counters[key] = self.counters.get(key, 0) + 1
+        if self.counters[key] == 1:
+            self.expires[key] = int(period)
+        return self.counters[key]
+
+def make_request(redis=None, host="10.0.0.1"):
+    """Requête factice : seuls client et app.state sont lus par le middleware"""
+    return SimpleNamespace(
+        client=SimpleNamespace(host=host),
+        app=SimpleNamespace(state=SimpleNamespace(redis=redis)),
+        method="GET"
+    )
+
+class CallCounter:
+    """call_next factice qui compte ses appels"""
+
+    def __init__(self, exc: Exception = None):
+        self.calls = 0
+        self.exc = exc
+
+    async def __call__(self, request):
+        self.calls += 1
+        if self.exc is not None:
+            raise self.exc
+        return SimpleNamespace(status_code=200)
+
+class TestRateLimitMiddleware:
+    """Tests pour la limitation de taux"""
+
+    @pytest.mark.asyncio
+    async def test_local_limit(self):
+        """Repli local : 429 au-delà de calls, sans appeler la route"""
+        middleware = RateLimitMiddleware(None, calls=2, period=60)
+        call_next = CallCounter()
+
+        statuses = [(await middleware.dispatch(make_request(), call_next)).status_code for _ in range(3)]
+
+        assert statuses == [200, 200, 429]
+        assert call_next.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_shared_limit_across_workers(self):
+        """Compteur Redis partagé entre deux instances (workers)"""
+        redis = FakeRedis()
+        workers = [RateLimitMiddleware(None, calls=2, period=60) for _ in range(2)]
+        call_next = CallCounter()
+
+        statuses = [
+            (await workers[i % 2].dispatch(make_request(redis), call_next)).status_code
+            for i in range(3)
+        ]
+
+        assert statuses == [200, 200, 429]
+        assert call_next.calls == 2
+        assert list(redis.expires.values()) == [60]
+        assert not workers[0].clients and not workers[1].clients
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_falls_back_once(self, caplog):
+        """Redis indisponible : repli local, un seul avertissement par période"""
+        middleware = RateLimitMiddleware(None, calls=10, period=60)
+        call_next = CallCounter()
+
+        with caplog.at_level(logging.WARNING, logger="src.api.middleware"):
+            for _ in range(3):
+                response = await middleware.dispatch(make_request(FakeRedis(fail=True)), call_next)
+                assert response.status_code == 200
+
+        assert call_next.calls == 3
+        assert len(middleware.clients["10.0.0.1"]) == 3
+        assert sum("Redis indisponible" in r.message for r in caplog.records) == 1
+
+    @pytest.mark.asyncio
+    async def test_route_exception_not_swallowed(self):
+        """Une exception de la route remonte et la route n'est appelée qu'une fois"""
+        middleware = RateLimitMiddleware(None, calls=10, period=60)
+        call_next = CallCounter(exc=RuntimeError("boom"))
+
+        with pytest.raises(RuntimeError):
+            await middleware.dispatch(make_request(FakeRedis()), call_next)
+
+        assert call_next.calls == 1
+
+    def test_sweep_removes_stale_clients(self):
+        """Le nettoyage supprime les IPs sans appel récent"""
+        middleware = RateLimitMiddleware(None, calls=10, period=60)
+        middleware.clients["old"] = deque([10.0])
+        middleware.clients["empty"] = deque()
+        middleware.clients["recent"] = deque([10.0, 100.0])
+
+        middleware._sweep(cutoff=50.0)
+
+        assert set(middleware.clients) == {"recent"}